@@ -4,24 +4,14 @@ title VoiceType - 打包成 EXE
 
 echo.
 echo  📦 正在打包 VoiceType 為獨立 EXE...
+echo  （預設僅雲端 STT；加上 --with-local-stt 一併打包本地 Whisper）
 echo.
 
 :: 安裝 pyinstaller
 pip install pyinstaller -q
 
-:: 打包
-pyinstaller ^
-    --name VoiceType ^
-    --onefile ^
-    --windowed ^
-    --icon assets\icon.ico ^
-    --add-data "ui;ui" ^
-    --add-data "assets;assets" ^
-    --add-data "config;config" ^
-    --hidden-import pystray._win32 ^
-    --hidden-import win32gui ^
-    --hidden-import win32api ^
-    main.py
+:: 打包（參數轉給 build.py，例如 build.bat --with-local-stt）
+python build.py %*
 
 echo.
 if exist dist\VoiceType.exe (
@@ -3,7 +3,10 @@ VoiceType 打包腳本
 將整個專案打包成單一 .exe 檔案，雙擊即可執行
 
 用法：
-  python build.py
+  python build.py                   # 僅雲端 STT（預設，體積較小）
+  python build.py --with-local-stt  # 一併打包本地 faster-whisper
+
+已安裝 PyAV（av）時會一併打包，上傳前將錄音壓縮成 Opus；未安裝則上傳 WAV。
 
 產出：
   dist/VoiceType.exe  (單一可執行檔)
@@ -12,7 +15,7 @@ VoiceType 打包腳本
   pip install pyinstaller
 """
 
-import os
+import argparse
 import sys
 import subprocess
 import shutil
@@ -22,6 +25,109 @@ ROOT = Path(__file__).parent
 DIST = ROOT / "dist"
 BUILD = ROOT / "build"
 
+# Hidden imports（PyInstaller 可能漏抓的模組）
+HIDDEN_IMPORTS = [
+    "pystray._win32",
+    "PIL.Image",
+    "sounddevice",
+    "_sounddevice_data",
+    "cffi",
+    "numpy",
+    "httpx",
+    "httpx._transports",
+    "httpx._transports.default",
+    "httpcore",
+    "httpcore._backends",
+    "httpcore._backends.sync",
+    "h11",
+    "h2",
+    "hpack",
+    "hyperframe",
+    "certifi",
+    "pyperclip",
+]
+
+# 排除不需要的大型套件
+EXCLUDES = [
+    "tkinter",
+    "matplotlib",
+    "scipy",
+    "pandas",
+    "torch",
+    "tensorflow",
+    "cv2",
+    "opencv-python",
+    "IPython",
+    "jedi",
+    "pygments",
+    "pytest",
+    "yapf",
+    "parso",
+    "sqlite3",
+    "websockets",
+]
+
+# 本地 STT 堆疊（只在 --with-local-stt 時打包）
+# av 不在此列：雲端 STT 上傳前的 Opus 壓縮也需要它，一律打包
+LOCAL_STT_MODULES = ["faster_whisper", "ctranslate2", "onnxruntime", "tokenizers"]
+
+# 打包進 exe 但執行時用不到的檔案（路徑片段比對）
+STRIP_PATTERNS = ("tests/", "testing/", "docs/", "examples/", "locale/")
+
+SPEC_TEMPLATE = """\
+# -*- mode: python ; coding: utf-8 -*-
+# 由 build.py 自動產生，請勿手動修改
+from PyInstaller.utils.hooks import collect_all
+
+datas = [({html!r}, "ui")]
+binaries = []
+hiddenimports = {hidden!r}
+for pkg in ("sounddevice", "_sounddevice_data"):
+    pkg_datas, pkg_binaries, pkg_hidden = collect_all(pkg)
+    datas += pkg_datas
+    binaries += pkg_binaries
+    hiddenimports += pkg_hidden
+
+a = Analysis(
+    [{script!r}],
+    pathex=[{root!r}],
+    binaries=binaries,
+    datas=datas,
+    hiddenimports=hiddenimports,
+    excludes={excludes!r},
+)
+
+STRIP = {strip!r}
+DROP = {drop!r}
+
+
+def _keep(entry):
+    path = entry[0].replace("\\\\", "/")
+    if path.startswith("ui/"):
+        return True
+    if any(p in path for p in STRIP):
+        return False
+    return not any(path.startswith(m + "/") or path.startswith(m + ".") for m in DROP)
+
+
+a.datas = [d for d in a.datas if _keep(d)]
+a.binaries = [b for b in a.binaries if _keep(b)]
+
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name="VoiceType",
+    console=False,
+    icon=[{icon!r}],
+    manifest={manifest!r},
+)
+"""
+
 
 def check_pyinstaller():
     try:
@@ -29,14 +135,16 @@ def check_pyinstaller():
         print(f"[OK] PyInstaller {PyInstaller.__version__}")
     except ImportError:
         print("[INFO] PyInstaller not found, installing...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"],
+                              close_fds=False)
         print("[OK] PyInstaller installed")
 
 
-def build():
+def build(with_local_stt: bool = False):
     print("=" * 50)
     print("  VoiceType Build Tool")
     print("=" * 50)
+    print(f"[INFO] Local STT (faster-whisper): {'included' if with_local_stt else 'excluded'}")
 
     check_pyinstaller()
 
@@ -51,61 +159,20 @@ def build():
     if not icon_path.exists():
         create_default_icon(icon_path)
 
-    # PyInstaller 指令
+    # 產生 spec 檔（可在 Analysis 之後過濾 datas/binaries，縮小 exe 體積）
+    spec_path = write_spec(icon_path, with_local_stt=with_local_stt)
     cmd = [
         sys.executable, "-m", "PyInstaller",
-        "--onefile",                        # 單一 exe
-        "--windowed",                       # 不顯示 console（系統托盤模式）
-        "--name=VoiceType",                 # exe 名稱
-        f"--icon={icon_path}",              # 應用圖示
-        # 嵌入資料檔
-        f"--add-data=ui/settings.html{os.pathsep}ui",
-        # Hidden imports（PyInstaller 可能漏抓的模組）
-        "--hidden-import=pystray._win32",
-        "--hidden-import=PIL.Image",
-        "--hidden-import=sounddevice",
-        "--hidden-import=_sounddevice_data",
-        "--hidden-import=cffi",
-        "--collect-all=sounddevice",
-        "--collect-all=_sounddevice_data",
-        "--hidden-import=numpy",
-        "--hidden-import=httpx",
-        "--hidden-import=httpx._transports",
-        "--hidden-import=httpx._transports.default",
-        "--hidden-import=httpcore",
-        "--hidden-import=httpcore._backends",
-        "--hidden-import=httpcore._backends.sync",
-        "--hidden-import=h11",
-        "--hidden-import=certifi",
-        "--hidden-import=pyperclip",
-        "--hidden-import=pyautogui",
-        "--hidden-import=keyboard",
-        "--hidden-import=keyboard._winkeyboard",
-        # 排除不需要的大型套件
-        "--exclude-module=tkinter",
-        "--exclude-module=matplotlib",
-        "--exclude-module=scipy",
-        "--exclude-module=pandas",
-        "--exclude-module=torch",
-        "--exclude-module=tensorflow",
-        "--exclude-module=cv2",
-        "--exclude-module=opencv-python",
-        "--exclude-module=IPython",
-        "--exclude-module=jedi",
-        "--exclude-module=pygments",
-        "--exclude-module=pytest",
-        "--exclude-module=yapf",
-        "--exclude-module=parso",
-        "--exclude-module=sqlite3",
-        "--exclude-module=websockets",
-        # 主程式
-        f"--manifest={ROOT / 'assets' / 'VoiceType.exe.manifest'}",
-        "main.py",
+        "--noconfirm",
+        f"--distpath={DIST}",
+        f"--workpath={BUILD / 'work'}",
+        str(spec_path),
     ]
 
     print(f"\n[BUILD] Starting...\n")
 
-    result = subprocess.run(cmd, cwd=str(ROOT))
+    # close_fds=False 讓 CPython 可改用 posix_spawn（Linux/macOS 較快；Windows 無影響）
+    result = subprocess.run(cmd, cwd=str(ROOT), close_fds=False)
 
     if result.returncode == 0:
         exe_path = DIST / "VoiceType.exe"
@@ -125,6 +192,33 @@ def build():
         print("   Check error messages above")
 
 
+def write_spec(icon_path: Path, with_local_stt: bool = False) -> Path:
+    """產生 VoiceType.spec，回傳 spec 檔路徑"""
+    excludes = list(EXCLUDES)
+    drop = []
+    if not with_local_stt:
+        excludes += LOCAL_STT_MODULES
+        drop = list(LOCAL_STT_MODULES)
+
+    spec = SPEC_TEMPLATE.format(
+        html=str(ROOT / "ui" / "settings.html"),
+        hidden=HIDDEN_IMPORTS,
+        script=str(ROOT / "main.py"),
+        root=str(ROOT),
+        excludes=excludes,
+        strip=STRIP_PATTERNS,
+        drop=drop,
+        icon=str(icon_path),
+        manifest=str(ROOT / "assets" / "VoiceType.exe.manifest"),
+    )
+
+    BUILD.mkdir(parents=True, exist_ok=True)
+    spec_path = BUILD / "VoiceType.spec"
+    spec_path.write_text(spec, encoding="utf-8")
+    print(f"[OK] Spec written: {spec_path}")
+    return spec_path
+
+
 def create_default_icon(icon_path: Path):
     """用 Pillow 建立一個簡單的橙色麥克風圖示"""
     icon_path.parent.mkdir(parents=True, exist_ok=True)
@@ -172,4 +266,8 @@ def create_default_icon(icon_path: Path):
 
 
 if __name__ == "__main__":
-    build()
+    parser = argparse.ArgumentParser(description="VoiceType Build Tool")
+    parser.add_argument("--with-local-stt", action="store_true",
+                        help="打包本地 faster-whisper（exe 體積較大）")
+    args = parser.parse_args()
+    build(with_local_stt=args.with_local_stt)
@@ -3,9 +3,11 @@
 讀寫 config.json，管理 API Key 和所有應用設定
 """
 
+import copy
 import json
 import logging
 import os
+import threading
 from pathlib import Path
 
 logger = logging.getLogger("VoiceType.Settings")
@@ -16,6 +18,14 @@ VALID_LLM_PROVIDERS = {"openai", "anthropic", "groq", "ollama"}
 VALID_HOTKEYS = {"RightAlt", "RightCtrl", "F9", "CapsLock", "ScrollLock"}
 VALID_LANGUAGES = {"auto", "zh-TW", "zh-CN", "en", "ja"}
 
+# Groq 的 OpenAI 相容 API 端點（STT 與 LLM 共用）
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# 設定變更後延遲寫檔的秒數（連續變更合併成一次寫入）
+SAVE_DEBOUNCE_SECONDS = 0.2
+# 寫檔失敗後重試的秒數
+SAVE_RETRY_SECONDS = 5.0
+
 # 預設設定
 DEFAULT_CONFIG = {
     "sttProvider": "groq",
@@ -35,6 +45,12 @@ DEFAULT_CONFIG = {
     "removeFiller": True,
     "autoFormat": True,
     "contextAware": True,
+    # 不含口頭禪且不超過此長度的短句直接輸出，不送 LLM（0 = 停用）
+    "polishSkipMaxLen": 30,
+    # 修飾結果快取（口述原文與結果以明文存於設定目錄的 polish_cache.json）
+    "polishCache": True,
+    # 口頭禪清單：命中任一個才需要 LLM 清理
+    "fillers": ["嗯", "啊", "呃", "那個", "就是說", "然後", "對了", "um", "uh", "like"],
     "dictionary": [],
     "systemPrompt": (
         "你是語音轉文字的編輯器。你的工作是清理口述文字的贅字和標點，僅此而已。\n\n"
@@ -71,7 +87,7 @@ DEFAULT_SYSTEM_PROMPT = DEFAULT_CONFIG["systemPrompt"]
 class Settings:
     """設定管理器"""
 
-    def __init__(self, config_dir: Path | None = None):
+    def __init__(self, config_dir: Path | None = None, autoload: bool = False):
         if config_dir:
             self.config_dir = Path(config_dir)
         else:
@@ -85,38 +101,125 @@ class Settings:
 
         self.config_path = self.config_dir / "config.json"
         self._config: dict = {}
+        self._rev = 0  # 設定版本號，每次載入/儲存遞增，供其他模組判斷快取是否失效
+        self._json_cache: tuple[int, bytes] | None = None  # (revision, JSON bytes)
+        # 保護設定內容與寫檔狀態；修改設定與寫檔前取快照都需持有
+        self._lock = threading.RLock()
+        self._save_timer: threading.Timer | None = None
+        self._dirty = False
+        self._closed = False  # close() 後不再排程延遲寫檔
+        if autoload:
+            self.load()
+
+    @property
+    def config(self) -> dict:
+        """當前設定（不檢查是否已載入；重新載入時保持同一個 dict 物件）"""
+        return self._config
+
+    @property
+    def revision(self) -> int:
+        """設定版本號（設定內容可能變更時遞增）"""
+        return self._rev
 
     def load(self) -> dict:
-        """載入設定檔，不存在則建立預設設定"""
+        """載入設定檔，不存在則建立預設設定（尚未寫入的變更會先寫入，不會被覆蓋掉）"""
+        self.flush()
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> dict:
         if self.config_path.exists():
             try:
-                with open(self.config_path, "r", encoding="utf-8") as f:
-                    saved = json.load(f)
+                # 一次讀入整個檔案再解析（設定檔很小，避免文字模式逐段解碼）
+                saved = json.loads(self.config_path.read_bytes())
 
                 # 合併預設值（確保新增欄位有預設值）
-                self._config = {**DEFAULT_CONFIG, **saved}
+                config = {**copy.deepcopy(DEFAULT_CONFIG), **saved}
 
                 # 合併 apiKeys（避免缺少的 key）
                 default_keys = DEFAULT_CONFIG.get("apiKeys", {})
                 saved_keys = saved.get("apiKeys", {})
-                self._config["apiKeys"] = {**default_keys, **saved_keys}
+                config["apiKeys"] = {**default_keys, **saved_keys}
+                self._replace_config(config)
 
                 logger.info("設定已載入: %s", self.config_path)
             except Exception as e:
                 logger.error("設定檔讀取失敗: %s，使用預設值", e)
-                self._config = DEFAULT_CONFIG.copy()
+                self._replace_config(copy.deepcopy(DEFAULT_CONFIG))
         else:
             logger.info("設定檔不存在，建立預設設定...")
-            self._config = DEFAULT_CONFIG.copy()
+            self._replace_config(copy.deepcopy(DEFAULT_CONFIG))
             self.save()
 
+        self._rev += 1
         return self._config
 
+    def _replace_config(self, config: dict):
+        """就地替換設定內容，讓其他模組持有的 dict 參照仍然有效
+
+        先整批 update 再移除已不存在的 key，不經過清空的中間狀態，
+        不持有鎖讀取設定的執行緒不會讀到空的 dict。
+        """
+        stale = self._config.keys() - config.keys()
+        self._config.update(config)
+        for key in stale:
+            self._config.pop(key, None)
+
     def save(self):
-        """儲存設定到檔案"""
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self._config, f, ensure_ascii=False, indent=2)
+        """立即儲存設定到檔案"""
+        with self._lock:
+            self._rev += 1
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+            self._cancel_save_timer()
+            self._write()
+
+    def flush(self):
+        """若有尚未寫入的變更，立即寫入（程式結束前呼叫）；失敗時稍後重試"""
+        with self._lock:
+            self._cancel_save_timer()
+            if not self._dirty:
+                return
+            try:
+                self._write()
+            except Exception as e:
+                logger.error("設定檔寫入失敗: %s", e)
+                self._start_save_timer(SAVE_RETRY_SECONDS)
+
+    def close(self):
+        """寫入尚未儲存的變更並停止延遲寫檔（之後的變更需自行 flush / save）"""
+        with self._lock:
+            self._closed = True
+        self.flush()
+
+    def _schedule_save(self):
+        """標記設定已變更，延遲一小段時間後再寫檔（合併連續的變更；需持有 _lock）"""
+        self._rev += 1
+        self._dirty = True
+        self._cancel_save_timer()
+        self._start_save_timer(SAVE_DEBOUNCE_SECONDS)
+
+    def _start_save_timer(self, delay: float):
+        """排程延遲寫檔（需持有 _lock）"""
+        if self._closed:
+            return
+        self._save_timer = threading.Timer(delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _cancel_save_timer(self):
+        """取消尚未觸發的延遲寫檔（需持有 _lock）"""
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+
+    def _write(self):
+        """寫入暫存檔再以 os.replace 取代，避免寫到一半當機造成設定檔損毀（需持有 _lock）"""
+        # 持有 _lock 時序列化，其他執行緒（設定頁面伺服器）無法同時修改設定
+        data = json.dumps(self._config, ensure_ascii=False, indent=2).encode("utf-8")
+        tmp_path = self.config_path.with_name(self.config_path.name + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.config_path)
+        self._dirty = False
         logger.info("設定已儲存: %s", self.config_path)
 
     def get_config(self) -> dict:
@@ -125,15 +228,28 @@ class Settings:
             self.load()
         return self._config
 
+    def get_config_json(self) -> bytes:
+        """取得當前設定的 JSON（UTF-8 bytes），同一版本號內重複使用編碼結果"""
+        cfg = self.get_config()
+        cached = self._json_cache
+        if cached is not None and cached[0] == self._rev:
+            return cached[1]
+        with self._lock:
+            data = json.dumps(cfg, ensure_ascii=False).encode("utf-8")
+        self._json_cache = (self._rev, data)
+        return data
+
     def update(self, key: str, value):
         """更新單一設定值"""
-        self._config[key] = value
-        self.save()
+        with self._lock:
+            self._config[key] = value
+            self._schedule_save()
 
     def update_all(self, new_config: dict):
         """批次更新設定"""
-        self._config.update(new_config)
-        self.save()
+        with self._lock:
+            self._config.update(new_config)
+            self._schedule_save()
 
     def get_api_key(self, provider: str) -> str:
         """取得指定引擎的 API Key"""
@@ -143,10 +259,11 @@ class Settings:
     def set_api_key(self, provider: str, key: str):
         """設定 API Key"""
         cfg = self.get_config()
-        if "apiKeys" not in cfg:
-            cfg["apiKeys"] = {}
-        cfg["apiKeys"][provider] = key
-        self.save()
+        with self._lock:
+            if "apiKeys" not in cfg:
+                cfg["apiKeys"] = {}
+            cfg["apiKeys"][provider] = key
+            self._schedule_save()
 
     def validate(self) -> list[str]:
         """驗證設定值，回傳警告訊息列表"""
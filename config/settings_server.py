@@ -4,6 +4,8 @@
 提供 REST API 讀寫 config.json
 """
 
+import gzip
+import importlib.util
 import json
 import logging
 import os
@@ -11,7 +13,7 @@ import sys
 import threading
 import webbrowser
 import winreg
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -26,34 +28,65 @@ _REG_PATH = r"Software\Microsoft\Windows\CurrentVersion\Run"
 _REG_NAME = "VoiceType"
 
 
+_reg_key = None                 # 常駐開啟的 Run 登錄機碼（避免每次都 OpenKey/CloseKey）
+_reg_lock = threading.Lock()
+
+
+def _autostart_command() -> str:
+    """開機啟動要執行的指令"""
+    if getattr(sys, 'frozen', False):
+        return f'"{sys.executable}"'
+    return f'"{sys.executable}" "{os.path.abspath(sys.argv[0])}"'
+
+
 def sync_autostart(enable: bool):
-    """同步 Windows 登錄檔的開機啟動項"""
+    """同步 Windows 登錄檔的開機啟動項（值未變更時不寫入）"""
+    global _reg_key
     try:
-        key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, _REG_PATH, 0,
-                             winreg.KEY_SET_VALUE | winreg.KEY_QUERY_VALUE)
-        if enable:
-            if getattr(sys, 'frozen', False):
-                exe_path = f'"{sys.executable}"'
-            else:
-                exe_path = f'"{sys.executable}" "{os.path.abspath(sys.argv[0])}"'
-            winreg.SetValueEx(key, _REG_NAME, 0, winreg.REG_SZ, exe_path)
-            logger.info("Autostart enabled: %s", exe_path)
-        else:
+        with _reg_lock:
+            if _reg_key is None:
+                _reg_key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, _REG_PATH, 0,
+                                          winreg.KEY_SET_VALUE | winreg.KEY_QUERY_VALUE)
             try:
-                winreg.DeleteValue(key, _REG_NAME)
-                logger.info("Autostart disabled")
+                current, _ = winreg.QueryValueEx(_reg_key, _REG_NAME)
             except FileNotFoundError:
-                pass
-        winreg.CloseKey(key)
+                current = None
+
+            if enable:
+                exe_path = _autostart_command()
+                if current != exe_path:
+                    winreg.SetValueEx(_reg_key, _REG_NAME, 0, winreg.REG_SZ, exe_path)
+                    logger.info("Autostart enabled: %s", exe_path)
+            elif current is not None:
+                winreg.DeleteValue(_reg_key, _REG_NAME)
+                logger.info("Autostart disabled")
     except Exception as e:
         logger.error("Failed to update autostart registry: %s", e)
 
 
+def _close_reg_key():
+    """關閉常駐的登錄機碼"""
+    global _reg_key
+    with _reg_lock:
+        if _reg_key is not None:
+            try:
+                winreg.CloseKey(_reg_key)
+            except Exception:
+                pass
+            _reg_key = None
+
+
 class SettingsAPIHandler(SimpleHTTPRequestHandler):
     """處理設定 API 和靜態檔案"""
 
     settings = None  # 由外部注入
 
+    # 回應寫入緩衝，標頭與內容在請求結束時一次送出（預設 0 = 每次 write 直接送出）
+    wbufsize = -1
+
+    # settings.html 快取：(mtime_ns, 原始內容, gzip 內容)，檔案變更時重新讀取
+    _html_cache: tuple[int, bytes, bytes] | None = None
+
     def __init__(self, *args, **kwargs):
         self.directory = str(Path(__file__).parent.parent / "ui")
         super().__init__(*args, directory=self.directory, **kwargs)
@@ -62,14 +95,17 @@ class SettingsAPIHandler(SimpleHTTPRequestHandler):
         parsed = urlparse(self.path)
 
         if parsed.path == "/api/config":
-            # 回傳當前設定
-            self._send_json(self.settings.get_config())
+            # 回傳當前設定（已編碼的 JSON 由 Settings 依版本號快取）
+            self._send_bytes(self.settings.get_config_json(),
+                             "application/json; charset=utf-8")
         elif parsed.path == "/api/health":
-            self._send_json({"status": "ok", "version": "0.1.0"})
+            # 只檢查 faster-whisper 是否存在（預設打包的 exe 不含），不匯入任何重量級模組
+            local_stt = importlib.util.find_spec("faster_whisper") is not None
+            self._send_json({"status": "ok", "version": "0.1.0", "localStt": local_stt})
+        elif parsed.path in ("/", "", "/settings.html"):
+            self._send_settings_page()
         else:
-            # 靜態檔案（UI）
-            if parsed.path == "/" or parsed.path == "":
-                self.path = "/settings.html"
+            # 其他靜態檔案（UI）
             super().do_GET()
 
     def do_POST(self):
@@ -111,12 +147,40 @@ class SettingsAPIHandler(SimpleHTTPRequestHandler):
         self._add_cors_headers()
         self.end_headers()
 
+    def _send_settings_page(self):
+        """回傳設定頁面，內容與 gzip 壓縮結果快取在記憶體"""
+        html_path = Path(self.directory) / "settings.html"
+        try:
+            mtime = html_path.stat().st_mtime_ns
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+
+        cache = SettingsAPIHandler._html_cache
+        if cache is None or cache[0] != mtime:
+            raw = html_path.read_bytes()
+            cache = (mtime, raw, gzip.compress(raw, 6))
+            SettingsAPIHandler._html_cache = cache
+
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            self._send_bytes(cache[2], "text/html; charset=utf-8", encoding="gzip")
+        else:
+            self._send_bytes(cache[1], "text/html; charset=utf-8")
+
     def _send_json(self, data, code=200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send_bytes(body, "application/json; charset=utf-8", code=code)
+
+    def _send_bytes(self, body: bytes, content_type: str, code=200, encoding=None):
         self.send_response(code)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
         self._add_cors_headers()
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        self.wfile.write(body)
 
     def _add_cors_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -140,7 +204,8 @@ def start_settings_server(settings, port=18923):
     SettingsAPIHandler.settings = settings
 
     try:
-        _server_instance = HTTPServer(("127.0.0.1", port), SettingsAPIHandler)
+        # 多執行緒處理請求：頁面與 API 請求可同時進行，不互相排隊
+        _server_instance = ThreadingHTTPServer(("127.0.0.1", port), SettingsAPIHandler)
     except OSError:
         # 端口被佔用，可能上次沒關乾淨
         logger.warning("Port %d 被佔用，直接開啟瀏覽器", port)
@@ -163,3 +228,4 @@ def stop_settings_server():
     if _server_instance:
         _server_instance.shutdown()
         _server_instance = None
+    _close_reg_key()
@@ -1,22 +1,142 @@
 """
 全域快捷鍵管理模組
 監聽 Push-to-Talk 快捷鍵（按住說話，放開處理）
+直接以 ctypes 安裝 WH_KEYBOARD_LL hook，非目標按鍵立即放行
 """
 
+import ctypes
 import logging
-import keyboard
+import queue
+import sys
+import threading
 
 logger = logging.getLogger("VoiceType.Hotkey")
 
-# 快捷鍵名稱映射到 keyboard 模組的鍵名
+# 快捷鍵名稱映射到 Windows 虛擬鍵碼（低階 hook 會區分左右鍵）
 HOTKEY_MAP = {
-    "RightAlt": "right alt",
-    "RightCtrl": "right ctrl",
-    "F9": "f9",
-    "CapsLock": "caps lock",
-    "ScrollLock": "scroll lock",
+    "RightAlt": 0xA5,    # VK_RMENU
+    "RightCtrl": 0xA3,   # VK_RCONTROL
+    "F9": 0x78,          # VK_F9
+    "CapsLock": 0x14,    # VK_CAPITAL
+    "ScrollLock": 0x91,  # VK_SCROLL
 }
 
+WH_KEYBOARD_LL = 13
+HC_ACTION = 0
+WM_QUIT = 0x0012
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+
+# hook 執行緒安裝 hook 的最長等待秒數
+HOOK_INSTALL_TIMEOUT = 2.0
+# 移除 hook 時等待 hook 執行緒結束的最長秒數
+HOOK_STOP_TIMEOUT = 0.5
+
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+    _LRESULT = ctypes.c_ssize_t
+    _LowLevelKeyboardProc = ctypes.WINFUNCTYPE(
+        _LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+
+    class _KBDLLHOOKSTRUCT(ctypes.Structure):
+        _fields_ = [
+            ("vkCode", wintypes.DWORD),
+            ("scanCode", wintypes.DWORD),
+            ("flags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t),
+        ]
+
+    _user32.SetWindowsHookExW.argtypes = [
+        ctypes.c_int, _LowLevelKeyboardProc, wintypes.HINSTANCE, wintypes.DWORD]
+    _user32.SetWindowsHookExW.restype = wintypes.HHOOK
+    _user32.CallNextHookEx.argtypes = [
+        wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM]
+    _user32.CallNextHookEx.restype = _LRESULT
+    _user32.UnhookWindowsHookEx.argtypes = [wintypes.HHOOK]
+    _user32.UnhookWindowsHookEx.restype = wintypes.BOOL
+    _user32.GetMessageW.argtypes = [
+        ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT]
+    _user32.GetMessageW.restype = wintypes.BOOL
+    _user32.PostThreadMessageW.argtypes = [
+        wintypes.DWORD, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    _user32.PostThreadMessageW.restype = wintypes.BOOL
+    _kernel32.GetModuleHandleW.argtypes = [wintypes.LPCWSTR]
+    _kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+    _kernel32.GetCurrentThreadId.restype = wintypes.DWORD
+
+
+class _KeyboardHook:
+    """在專屬執行緒安裝 WH_KEYBOARD_LL hook，只把指定按鍵的按下/釋放交給 callback"""
+
+    def __init__(self, vk: int, callback):
+        self._vk = vk
+        self._callback = callback  # callback(is_down: bool)，在 hook 執行緒上呼叫，必須立即返回
+        self._thread = None
+        self._thread_id = 0
+        self._error = None
+
+    def start(self):
+        """啟動 hook 執行緒，等到 hook 安裝完成才返回（失敗時拋出 OSError）"""
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(ready,), daemon=True, name="VoiceType-Hotkey")
+        self._thread.start()
+        if not ready.wait(HOOK_INSTALL_TIMEOUT):
+            raise OSError("Keyboard hook installation timed out")
+        if self._error:
+            raise self._error
+        return self
+
+    def stop(self):
+        """通知 hook 執行緒結束訊息迴圈，等到 hook 確實移除才返回（有上限）"""
+        if self._thread_id:
+            _user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread_id = 0
+            if self._thread is not threading.current_thread():
+                self._thread.join(HOOK_STOP_TIMEOUT)
+
+    def _run(self, ready):
+        # callback 物件必須在訊息迴圈期間保持存活，否則會被回收
+        proc = _LowLevelKeyboardProc(self._proc)
+        hhook = _user32.SetWindowsHookExW(
+            WH_KEYBOARD_LL, proc, _kernel32.GetModuleHandleW(None), 0)
+        if not hhook:
+            self._error = ctypes.WinError(ctypes.get_last_error())
+            ready.set()
+            return
+
+        self._thread_id = _kernel32.GetCurrentThreadId()
+        ready.set()
+
+        # 低階 hook 需要安裝它的執行緒持續處理訊息
+        msg = wintypes.MSG()
+        try:
+            while _user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                pass
+        finally:
+            _user32.UnhookWindowsHookEx(hhook)
+
+    def _proc(self, n_code, w_param, l_param):
+        try:
+            if n_code == HC_ACTION:
+                kb = ctypes.cast(l_param, ctypes.POINTER(_KBDLLHOOKSTRUCT)).contents
+                if kb.vkCode == self._vk:
+                    if w_param in (WM_KEYDOWN, WM_SYSKEYDOWN):
+                        self._callback(True)
+                    elif w_param in (WM_KEYUP, WM_SYSKEYUP):
+                        self._callback(False)
+        except Exception as e:
+            logger.error("Keyboard hook callback error: %s", e)
+        # 不攔截任何按鍵（callback 出錯也一樣），避免鍵盤鎖死
+        return _user32.CallNextHookEx(None, n_code, w_param, l_param)
+
 
 class HotkeyManager:
     """全域快捷鍵管理器"""
@@ -26,9 +146,11 @@ class HotkeyManager:
         self._on_press = None
         self._on_release = None
         self._running = False
-        self._hotkey_name = None
-        self._press_hook = None
-        self._release_hook = None
+        self._hotkey_vk = None
+        self._hook = None
+        self._held = False  # 按住中：過濾鍵盤自動重複的按下事件
+        self._events = queue.SimpleQueue()
+        self._dispatcher = None
 
     def register(self, on_press, on_release):
         """
@@ -42,18 +164,49 @@ class HotkeyManager:
         self._on_release = on_release
         self._running = True
 
-        cfg = self.settings.get_config()
+        cfg = self.settings.config
         hotkey_id = cfg.get("hotkey", "RightAlt")
-        key_name = HOTKEY_MAP.get(hotkey_id, "right alt")
-        self._hotkey_name = key_name
+        vk = HOTKEY_MAP.get(hotkey_id, HOTKEY_MAP["RightAlt"])
+        self._hotkey_vk = vk
+        self._held = False
+
+        # 回呼在獨立執行緒執行：hook 執行緒必須立即返回，否則 Windows 會移除 hook
+        # 每個回呼執行緒使用自己的佇列，stop() 送出的結束訊號不會被下一個執行緒收到
+        if self._dispatcher is None:
+            self._events = queue.SimpleQueue()
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, args=(self._events,),
+                daemon=True, name="VoiceType-HotkeyDispatch")
+            self._dispatcher.start()
 
-        # 註冊按下和釋放事件，不使用 suppress 避免鍵盤鎖死
-        self._press_hook = keyboard.on_press_key(key_name, self._handle_press, suppress=False)
-        self._release_hook = keyboard.on_release_key(key_name, self._handle_release, suppress=False)
+        self.unhook()
+        self._hook = _KeyboardHook(vk, self._handle_event).start()
 
-        logger.info("Hotkey registered: %s -> %s", hotkey_id, key_name)
+        logger.info("Hotkey registered: %s -> VK 0x%02X", hotkey_id, vk)
 
-    def _handle_press(self, event):
+    def _handle_event(self, is_down: bool):
+        """依事件類型分派按下/釋放（按住時的自動重複只觸發一次）"""
+        if is_down:
+            if not self._held:
+                self._held = True
+                self._dispatch(self._handle_press)
+        else:
+            self._held = False
+            self._dispatch(self._handle_release)
+
+    def _dispatch(self, handler):
+        """交給回呼執行緒處理"""
+        self._events.put(handler)
+
+    @staticmethod
+    def _dispatch_loop(events):
+        while True:
+            handler = events.get()
+            if handler is None:  # stop() 送出的結束訊號
+                return
+            handler()
+
+    def _handle_press(self):
         """處理按下事件"""
         if self._running and self._on_press:
             try:
@@ -61,7 +214,7 @@ class HotkeyManager:
             except Exception as e:
                 logger.error("Hotkey press callback error: %s", e)
 
-    def _handle_release(self, event):
+    def _handle_release(self):
         """處理釋放事件"""
         if self._running and self._on_release:
             try:
@@ -71,21 +224,18 @@ class HotkeyManager:
 
     def unhook(self):
         """移除此管理器註冊的 hook（不影響其他程式的 hook）"""
-        if self._press_hook:
-            try:
-                keyboard.unhook(self._press_hook)
-            except Exception:
-                pass
-            self._press_hook = None
-        if self._release_hook:
+        if self._hook:
             try:
-                keyboard.unhook(self._release_hook)
+                self._hook.stop()
             except Exception:
                 pass
-            self._release_hook = None
+            self._hook = None
 
     def stop(self):
         """停止快捷鍵監聽"""
         self._running = False
         self.unhook()
+        if self._dispatcher is not None:
+            self._events.put(None)
+            self._dispatcher = None
         logger.info("Hotkey listener stopped")
@@ -2,19 +2,119 @@
 文字注入模組
 將修飾後的文字注入到當前游標位置
 
-使用剪貼簿 + Ctrl+V 方式，相容所有應用程式（Chrome、Firefox、桌面應用）
+兩種輸出模式（設定 outputMode）：
+  clipboard：剪貼簿 + Ctrl+V，相容所有應用程式（Chrome、Firefox、桌面應用）
+  keyboard：以 SendInput + KEYEVENTF_UNICODE 直接輸入字元，不經剪貼簿、不覆蓋使用者的剪貼簿內容
+按鍵以 SendInput 直接送出（不經 pyautogui，避免其 import 成本與內建的暫停）
 """
 
+import ctypes
+import sys
 import time
 import logging
 
 import pyperclip
-import pyautogui
 
 logger = logging.getLogger("VoiceType.Injector")
 
 CLIPBOARD_SETTLE_SECONDS = 0.1
 
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+VK_RETURN = 0x0D
+VK_CONTROL = 0x11
+VK_ESCAPE = 0x1B
+VK_V = 0x56
+
+
+# SendInput 結構（欄位以固定寬度型別定義，與 Windows 的 DWORD/WORD/LONG 一致）
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ("wVk", ctypes.c_uint16),
+        ("wScan", ctypes.c_uint16),
+        ("dwFlags", ctypes.c_uint32),
+        ("time", ctypes.c_uint32),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", ctypes.c_int32),
+        ("dy", ctypes.c_int32),
+        ("mouseData", ctypes.c_uint32),
+        ("dwFlags", ctypes.c_uint32),
+        ("time", ctypes.c_uint32),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+class _INPUTUNION(ctypes.Union):
+    # 包含 MOUSEINPUT 讓 sizeof(INPUT) 與 Windows 定義相同
+    _fields_ = [("ki", _KEYBDINPUT), ("mi", _MOUSEINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_uint32), ("u", _INPUTUNION)]
+
+
+def _key_combo(*vks) -> ctypes.Array:
+    """組合鍵的 INPUT 陣列：依序按下，再反序放開"""
+    events = [(vk, 0) for vk in vks] + [(vk, KEYEVENTF_KEYUP) for vk in reversed(vks)]
+    inputs = (_INPUT * len(events))()
+    for item, (vk, flags) in zip(inputs, events):
+        item.type = INPUT_KEYBOARD
+        item.u.ki.wVk = vk
+        item.u.ki.dwFlags = flags
+    return inputs
+
+
+def _unicode_inputs(text: str) -> ctypes.Array:
+    """文字的 Unicode 按鍵序列：每個 UTF-16 單位一組按下/放開（emoji 等會拆成代理對）"""
+    events = []
+    for line_no, line in enumerate(text.replace("\r\n", "\n").split("\n")):
+        if line_no:
+            # 換行用 Enter 鍵，Unicode 的 \n 在多數編輯器不會換行
+            events += [(VK_RETURN, 0, 0), (VK_RETURN, 0, KEYEVENTF_KEYUP)]
+        data = line.encode("utf-16-le")
+        for i in range(0, len(data), 2):
+            unit = int.from_bytes(data[i:i + 2], "little")
+            events += [
+                (0, unit, KEYEVENTF_UNICODE),
+                (0, unit, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP),
+            ]
+    inputs = (_INPUT * len(events))()
+    for item, (vk, scan, flags) in zip(inputs, events):
+        item.type = INPUT_KEYBOARD
+        item.u.ki.wVk = vk
+        item.u.ki.wScan = scan
+        item.u.ki.dwFlags = flags
+    return inputs
+
+
+# 預先建立常用按鍵序列，送出時不必再組裝
+_CTRL_V = _key_combo(VK_CONTROL, VK_V)
+_ESCAPE = _key_combo(VK_ESCAPE)
+
+if sys.platform == "win32":
+    # 獨立的 WinDLL 實例：設定 argtypes 不影響其他共用 windll.user32 的程式碼，且保留 GetLastError
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _SendInput = _user32.SendInput
+    _SendInput.argtypes = [ctypes.c_uint, ctypes.POINTER(_INPUT), ctypes.c_int]
+    _SendInput.restype = ctypes.c_uint
+else:
+    _SendInput = None
+
+
+def _send_inputs(inputs: ctypes.Array) -> int:
+    """以單次 SendInput 送出整組按鍵事件，回傳實際送出的事件數"""
+    sent = _SendInput(len(inputs), inputs, ctypes.sizeof(_INPUT))
+    if sent != len(inputs):
+        raise OSError(f"SendInput sent {sent}/{len(inputs)} events "
+                      f"(error {ctypes.get_last_error()})")
+    return sent
+
 
 class TextInjector:
     """文字注入引擎"""
@@ -23,15 +123,23 @@ class TextInjector:
         self.settings = settings
 
     def inject(self, text: str):
-        """將文字注入到當前游標位置（剪貼簿 + Ctrl+V）"""
+        """將文字注入到當前游標位置（依 outputMode 選擇鍵盤輸入或剪貼簿貼上）"""
         if not text:
             return
 
         try:
-            pyperclip.copy(text)
-            time.sleep(CLIPBOARD_SETTLE_SECONDS)
-            pyautogui.hotkey("ctrl", "v")
-            logger.info("Injected %d characters via clipboard", len(text))
+            if self.settings.config.get("outputMode", "clipboard") == "keyboard":
+                _send_inputs(_unicode_inputs(text))
+                logger.info("Injected %d characters via keyboard", len(text))
+            else:
+                pyperclip.copy(text)
+                time.sleep(CLIPBOARD_SETTLE_SECONDS)
+                _send_inputs(_CTRL_V)
+                logger.info("Injected %d characters via clipboard", len(text))
         except Exception as e:
             logger.error("Text injection failed: %s", e)
             raise
+
+    def send_escape(self):
+        """送出 Escape 鍵（取消放開 Alt 後啟動的選單列）"""
+        _send_inputs(_ESCAPE)
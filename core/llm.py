@@ -4,41 +4,152 @@ LLM 智能修飾模組
 支援 OpenAI ChatGPT、Anthropic Claude、Groq、Ollama
 """
 
+import json
 import logging
+import re
+from typing import Callable
 
-from config.settings import DEFAULT_SYSTEM_PROMPT
+from config.settings import DEFAULT_CONFIG, DEFAULT_SYSTEM_PROMPT, GROQ_BASE_URL
+from core.net import get_http_client
+from core.polish_cache import PolishCache
 
 logger = logging.getLogger("VoiceType.LLM")
 
+# 視窗標題關鍵字 → 語境說明（依序比對，先命中者優先）
+_CONTEXT_PATTERNS = [
+    (re.compile(r"outlook|gmail|mail|thunderbird"),
+     "用戶正在撰寫郵件，語氣應正式專業"),
+    (re.compile(r"discord|line|messenger|telegram|whatsapp"),
+     "用戶正在聊天，語氣可以輕鬆口語"),
+    (re.compile(r"slack|teams"),
+     "用戶在工作通訊軟體，語氣應簡潔專業"),
+    (re.compile(r"word|docs|notion|obsidian"),
+     "用戶在撰寫文件，語氣應清晰有條理"),
+    (re.compile(r"code|vscode|visual studio|pycharm"),
+     "用戶在寫程式，可能是在寫註解或文件，語氣應技術性簡潔"),
+]
+
+# 口頭禪比對用的正規表示式，依設定中的 fillers 清單建立並快取
+_filler_re_cache: tuple[tuple, re.Pattern | None] = ((), None)
+# 句尾已有標點，視為 STT 已輸出完整句子
+_END_PUNCT_RE = re.compile(r"[。！？.!?]$")
+
+# win32gui（pywin32，選用）於首次偵測語境時載入，之後直接使用快取的函式
+_win32_loaded = False
+_GetForegroundWindow = None
+_GetWindowText = None
+
+
+def _filler_pattern(fillers) -> re.Pattern | None:
+    """將口頭禪清單編譯為正規表示式（英文詞以字邊界比對，避免 like 命中 likely）"""
+    global _filler_re_cache
+    key = tuple(fillers)
+    if key != _filler_re_cache[0]:
+        parts = [
+            rf"\b{re.escape(f)}\b" if f.isascii() else re.escape(f)
+            for f in key if f
+        ]
+        pattern = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+        _filler_re_cache = (key, pattern)
+    return _filler_re_cache[1]
+
+
+def should_polish(raw_text: str, cfg: dict) -> bool:
+    """
+    判斷是否需要送 LLM 修飾
+
+    不需要的情況：去贅字與格式化都關閉；或沒有口頭禪，且是短句或句尾已有標點
+    """
+    text = raw_text.strip()
+    if len(text) < 3:
+        return False
+    if not cfg.get("removeFiller", True) and not cfg.get("autoFormat", True):
+        return False
+
+    pattern = _filler_pattern(cfg.get("fillers", DEFAULT_CONFIG["fillers"]))
+    if pattern is not None and pattern.search(text):
+        return True
+    if len(text) <= cfg.get("polishSkipMaxLen", 30):
+        return False
+    return not _END_PUNCT_RE.search(text)
+
+
+def _load_win32gui() -> bool:
+    """載入 win32gui 並快取所需函式，未安裝 pywin32 時回傳 False"""
+    global _win32_loaded, _GetForegroundWindow, _GetWindowText
+    if not _win32_loaded:
+        _win32_loaded = True
+        try:
+            import win32gui
+            _GetForegroundWindow = win32gui.GetForegroundWindow
+            _GetWindowText = win32gui.GetWindowText
+        except ImportError:
+            logger.info("未安裝 pywin32，停用語境偵測")
+    return _GetWindowText is not None
+
 
 class LLMProcessor:
     """LLM 文字修飾引擎"""
 
-    def __init__(self, settings):
+    # 延遲載入的 SDK 符號：保留函式內 import 以加快啟動，首次使用後快取於類別
+    _OpenAI = None
+    _anthropic = None
+
+    def __init__(self, settings, cache: PolishCache | None = None):
         self.settings = settings
+        self.cache = cache  # 修飾結果快取（選用，由主程式持有並負責存檔）
         self._target_hwnd = None
-
-    def polish(self, raw_text: str, target_hwnd=None) -> str:
-        """將 STT 原始文字修飾為乾淨的輸出"""
-        cfg = self.settings.get_config()
+        self._context_cache = (None, "")  # (視窗標題, 語境說明)
+        # 系統提示詞快取：語境 → 提示詞，設定版本變更時清空
+        self._prompt_cache: dict[str, str] = {}
+        self._prompt_rev = -1
+        # 快取 API 客戶端，重複使用連線池（避免每次呼叫都重新 TLS 握手）
+        self._clients: dict[tuple, object] = {}
+        self._ollama_client = None
+
+    def polish(self, raw_text: str, target_hwnd=None,
+               on_token: Callable[[str], None] | None = None) -> str:
+        """
+        將 STT 原始文字修飾為乾淨的輸出
+
+        Args:
+            raw_text: STT 原始文字
+            target_hwnd: 錄音開始時的前景視窗（語境偵測用）
+            on_token: 串流回呼，每收到一段 LLM 輸出就呼叫一次（跳過 LLM 時不呼叫）
+
+        Returns:
+            修飾後的完整文字
+        """
+        cfg = self.settings.config
         provider = cfg.get("llmProvider", "openai")
 
         # 儲存目標視窗供 _detect_context 使用
         self._target_hwnd = target_hwnd
 
-        # 如果文字很短且乾淨，可以跳過 LLM
-        if len(raw_text.strip()) < 3:
-            return raw_text.strip()
+        # 文字已乾淨（或功能關閉）時跳過 LLM，省下整個往返
+        text = raw_text.strip()
+        if not should_polish(text, cfg):
+            return text
+
+        # 相同口述內容（同引擎、模型、提示詞）直接使用上次的結果
+        cache_key = None
+        if self.cache is not None and cfg.get("polishCache", True):
+            cache_key = PolishCache.make_key(
+                text, provider, cfg.get("llmModel", ""), self._get_system_prompt(cfg))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("使用快取的修飾結果，跳過 LLM")
+                return cached
 
         try:
             if provider == "openai":
-                return self._polish_openai(raw_text, cfg)
+                polished = self._polish_openai(raw_text, cfg, on_token)
             elif provider == "anthropic":
-                return self._polish_anthropic(raw_text, cfg)
+                polished = self._polish_anthropic(raw_text, cfg, on_token)
             elif provider == "groq":
-                return self._polish_groq(raw_text, cfg)
+                polished = self._polish_groq(raw_text, cfg, on_token)
             elif provider == "ollama":
-                return self._polish_ollama(raw_text, cfg)
+                polished = self._polish_ollama(raw_text, cfg, on_token)
             else:
                 logger.warning("未知 LLM 引擎 %s，直接輸出原文", provider)
                 return raw_text.strip()
@@ -46,8 +157,52 @@ class LLMProcessor:
             logger.error("LLM 修飾失敗: %s，回退為原文", e)
             return raw_text.strip()
 
+        if cache_key and polished:
+            self.cache.put(cache_key, polished)
+        return polished
+
+    def prewarm(self):
+        """預先建立客戶端並打開連線，縮短第一次修飾的延遲"""
+        cfg = self.settings.config
+        provider = cfg.get("llmProvider", "openai")
+
+        if provider == "ollama":
+            if self._ollama_client is None:
+                self._ollama_client = get_http_client()
+            endpoint = self.settings.get_api_key("ollama") or "http://localhost:11434"
+            self._ollama_client.get(f"{endpoint}/api/tags", timeout=5.0)
+        else:
+            api_key = self.settings.get_api_key(provider)
+            if not api_key:
+                return
+            if provider == "anthropic":
+                client = self._get_anthropic_client(api_key)
+                if not hasattr(client, "models"):  # 舊版 SDK 沒有 models API
+                    return
+            elif provider == "groq":
+                client = self._get_openai_client("groq", api_key, GROQ_BASE_URL)
+            elif provider == "openai":
+                client = self._get_openai_client("openai", api_key)
+            else:
+                return
+            # 輕量請求，只為了完成 DNS + TCP + TLS，連線會留在客戶端的連線池
+            client.with_options(timeout=5.0).models.list()
+        logger.info("LLM 連線已預熱: %s", provider)
+
     def _get_system_prompt(self, cfg: dict) -> str:
         """取得系統提示詞（含語境資訊與自訂字典）"""
+        # 語境適應：偵測當前 App
+        context = self._detect_context() if cfg.get("contextAware", True) else ""
+
+        # 設定未變更且語境相同時，直接使用已組好的提示詞
+        revision = self.settings.revision
+        if revision != self._prompt_rev:
+            self._prompt_cache.clear()
+            self._prompt_rev = revision
+        cached = self._prompt_cache.get(context)
+        if cached is not None:
+            return cached
+
         base_prompt = cfg.get("systemPrompt", DEFAULT_SYSTEM_PROMPT)
 
         # 自訂字典：讓 LLM 知道這些專有名詞的正確寫法
@@ -58,104 +213,117 @@ class LLMProcessor:
                 f"\n\n自訂字典（請確保這些詞彙使用正確的拼寫和大小寫）：\n{words}"
             )
 
-        # 語境適應：偵測當前 App
-        if cfg.get("contextAware", True):
-            context = self._detect_context()
-            if context:
-                base_prompt += f"\n\n當前語境：{context}"
+        if context:
+            base_prompt += f"\n\n當前語境：{context}"
 
+        self._prompt_cache[context] = base_prompt
         return base_prompt
 
     def _detect_context(self) -> str:
         """偵測當前使用的 App 來調整語氣"""
+        if not _load_win32gui():
+            return ""
         try:
-            import win32gui
             # 使用快取的 hwnd，避免再次呼叫 GetForegroundWindow（此時焦點可能已改變）
             hwnd = getattr(self, '_target_hwnd', None)
             if not hwnd:
-                hwnd = win32gui.GetForegroundWindow()
-            title = win32gui.GetWindowText(hwnd).lower()
-
-            if any(k in title for k in ["outlook", "gmail", "mail", "thunderbird"]):
-                return "用戶正在撰寫郵件，語氣應正式專業"
-            elif any(k in title for k in ["discord", "line", "messenger", "telegram", "whatsapp"]):
-                return "用戶正在聊天，語氣可以輕鬆口語"
-            elif any(k in title for k in ["slack", "teams"]):
-                return "用戶在工作通訊軟體，語氣應簡潔專業"
-            elif any(k in title for k in ["word", "docs", "notion", "obsidian"]):
-                return "用戶在撰寫文件，語氣應清晰有條理"
-            elif any(k in title for k in ["code", "vscode", "visual studio", "pycharm"]):
-                return "用戶在寫程式，可能是在寫註解或文件，語氣應技術性簡潔"
+                hwnd = _GetForegroundWindow()
+            title = _GetWindowText(hwnd).lower()
         except Exception:
-            pass
-        return ""
+            return ""
+
+        # 使用者停留在同一視窗時，標題不變，直接回傳上次結果
+        if title == self._context_cache[0]:
+            return self._context_cache[1]
+
+        context = ""
+        for pattern, message in _CONTEXT_PATTERNS:
+            if pattern.search(title):
+                context = message
+                break
+        self._context_cache = (title, context)
+        return context
+
+    def _get_openai_client(self, provider: str, api_key: str, base_url: str | None = None):
+        """取得（或建立）OpenAI 相容客戶端，以 (provider, api_key, base_url) 為快取鍵"""
+        key = (provider, api_key, base_url)
+        client = self._clients.get(key)
+        if client is None:
+            if LLMProcessor._OpenAI is None:
+                from openai import OpenAI
+                LLMProcessor._OpenAI = OpenAI
+            client = LLMProcessor._OpenAI(
+                api_key=api_key, base_url=base_url, http_client=get_http_client())
+            self._clients[key] = client
+        return client
+
+    def _get_anthropic_client(self, api_key: str):
+        """取得（或建立）Anthropic 客戶端"""
+        key = ("anthropic", api_key, None)
+        client = self._clients.get(key)
+        if client is None:
+            if LLMProcessor._anthropic is None:
+                import anthropic
+                LLMProcessor._anthropic = anthropic
+            client = LLMProcessor._anthropic.Anthropic(
+                api_key=api_key, http_client=get_http_client())
+            self._clients[key] = client
+        return client
 
     # ── OpenAI ChatGPT ───────────────────────────────────────────────────────
 
-    def _polish_openai(self, raw_text: str, cfg: dict) -> str:
-        from openai import OpenAI
-
+    def _polish_openai(self, raw_text: str, cfg: dict, on_token=None) -> str:
         api_key = self.settings.get_api_key("openai")
         if not api_key:
             raise ValueError("OpenAI API Key 未設定")
 
-        client = OpenAI(api_key=api_key)
+        client = self._get_openai_client("openai", api_key)
         model = cfg.get("llmModel", "gpt-4o-mini")
-        system_prompt = self._get_system_prompt(cfg)
-
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": raw_text},
-            ],
-            temperature=0.1,  # 極低溫度：嚴格遵守指令
-            max_tokens=2048,
-        )
-
-        return response.choices[0].message.content.strip()
+        return self._stream_chat(client, model, raw_text, cfg, on_token)
 
     # ── Anthropic Claude ─────────────────────────────────────────────────────
 
-    def _polish_anthropic(self, raw_text: str, cfg: dict) -> str:
-        import anthropic
-
+    def _polish_anthropic(self, raw_text: str, cfg: dict, on_token=None) -> str:
         api_key = self.settings.get_api_key("anthropic")
         if not api_key:
             raise ValueError("Anthropic API Key 未設定")
 
-        client = anthropic.Anthropic(api_key=api_key)
+        client = self._get_anthropic_client(api_key)
         model = cfg.get("llmModel", "claude-haiku-4-5-20251001")
         system_prompt = self._get_system_prompt(cfg)
 
-        response = client.messages.create(
+        parts = []
+        with client.messages.stream(
             model=model,
             max_tokens=2048,
             system=system_prompt,
             messages=[
                 {"role": "user", "content": raw_text},
             ],
-        )
+        ) as stream:
+            for token in stream.text_stream:
+                parts.append(token)
+                if on_token:
+                    on_token(token)
 
-        return response.content[0].text.strip()
+        return "".join(parts).strip()
 
     # ── Groq（OpenAI 相容）───────────────────────────────────────────────────
 
-    def _polish_groq(self, raw_text: str, cfg: dict) -> str:
-        from openai import OpenAI
-
+    def _polish_groq(self, raw_text: str, cfg: dict, on_token=None) -> str:
         api_key = self.settings.get_api_key("groq")
         if not api_key:
             raise ValueError("Groq API Key 未設定")
 
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.groq.com/openai/v1",
-        )
+        client = self._get_openai_client("groq", api_key, GROQ_BASE_URL)
         model = cfg.get("llmModel", "llama-3.3-70b-versatile")
+        return self._stream_chat(client, model, raw_text, cfg, on_token)
+
+    def _stream_chat(self, client, model: str, raw_text: str, cfg: dict, on_token=None) -> str:
+        """以串流方式呼叫 OpenAI 相容的 chat completions，逐段回呼並合併結果"""
         system_prompt = self._get_system_prompt(cfg)
 
-        response = client.chat.completions.create(
+        stream = client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -163,32 +331,59 @@ class LLMProcessor:
             ],
             temperature=0.1,  # 極低溫度：嚴格遵守指令
             max_tokens=2048,
+            stream=True,
         )
 
-        return response.choices[0].message.content.strip()
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                if on_token:
+                    on_token(token)
+        return "".join(parts).strip()
 
     # ── Ollama 本地 ──────────────────────────────────────────────────────────
 
-    def _polish_ollama(self, raw_text: str, cfg: dict) -> str:
-        import requests
+    def _polish_ollama(self, raw_text: str, cfg: dict, on_token=None) -> str:
+        if self._ollama_client is None:
+            # 共用連線池，保持與本地 Ollama 的 TCP 連線（keep-alive）
+            self._ollama_client = get_http_client()
 
         endpoint = self.settings.get_api_key("ollama") or "http://localhost:11434"
         model = cfg.get("llmModel", "qwen3:8b")
         system_prompt = self._get_system_prompt(cfg)
 
-        response = requests.post(
+        parts = []
+        with self._ollama_client.stream(
+            "POST",
             f"{endpoint}/api/chat",
+            timeout=30.0,
             json={
                 "model": model,
                 "messages": [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": raw_text},
                 ],
-                "stream": False,
+                "stream": True,
                 "options": {"temperature": 0.1},  # 極低溫度：嚴格遵守指令
             },
-            timeout=30,
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["message"]["content"].strip()
+        ) as response:
+            response.raise_for_status()
+            # 串流回應為 NDJSON：每行一個片段，最後一行 done=true
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama 錯誤: {chunk['error']}")
+                token = chunk.get("message", {}).get("content", "")
+                if token:
+                    parts.append(token)
+                    if on_token:
+                        on_token(token)
+                if chunk.get("done"):
+                    break
+        return "".join(parts).strip()
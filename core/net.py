@@ -0,0 +1,53 @@
+"""
+共用 HTTP 連線池
+STT 與 LLM 的 SDK 客戶端共用同一個 httpx.Client，
+預熱時建立的 TLS 連線可直接被之後的辨識 / 修飾請求重複使用；
+安裝 h2 時以 HTTP/2 連線，同一主機的請求在單一連線上多工
+"""
+
+import importlib.util
+import logging
+import threading
+
+logger = logging.getLogger("VoiceType.Net")
+
+# 閒置連線保留秒數（httpx 預設 5 秒，兩次口述之間的間隔通常更長）
+KEEPALIVE_EXPIRY_SECONDS = 300.0
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """取得共用的 httpx.Client（首次呼叫時建立）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                # HTTP/2 需要 h2 套件；未安裝時使用 HTTP/1.1
+                http2 = importlib.util.find_spec("h2") is not None
+                _client = httpx.Client(
+                    http2=http2,
+                    # 各 SDK 會在每次請求帶入自己的逾時設定，這裡只是預設值
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    limits=httpx.Limits(
+                        max_connections=20,
+                        max_keepalive_connections=10,
+                        keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+                    ),
+                )
+                logger.info("HTTP client ready (HTTP/2: %s)", "on" if http2 else "off")
+    return _client
+
+
+def close_http_client():
+    """關閉共用連線池（程式結束時呼叫）"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            try:
+                _client.close()
+            except Exception:
+                pass
+            _client = None
@@ -0,0 +1,103 @@
+"""
+LLM 修飾結果快取
+相同的口述內容（同引擎、同模型、同提示詞）直接回傳上次的修飾結果，省下 LLM 往返
+以 LRU 保留最近的結果，程式結束時存檔，下次啟動沿用
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger("VoiceType.PolishCache")
+
+# 最多保留的修飾結果數量
+POLISH_CACHE_SIZE = 256
+
+
+def _normalize(text: str) -> str:
+    """正規化口述文字：去頭尾空白、合併連續空白"""
+    return " ".join(text.split())
+
+
+class PolishCache:
+    """LLM 修飾結果的 LRU 快取（執行緒安全）"""
+
+    def __init__(self, path: Path | None = None, max_size: int = POLISH_CACHE_SIZE):
+        self.path = Path(path) if path else None
+        self.max_size = max_size
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @staticmethod
+    def make_key(raw_text: str, provider: str, model: str, system_prompt: str) -> str:
+        """以引擎、模型、提示詞與正規化後的文字組成快取鍵"""
+        data = "\0".join((provider, model, system_prompt, _normalize(raw_text)))
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """從檔案載入快取（檔案不存在或損毀時從空快取開始）"""
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_bytes())
+        except Exception as e:
+            logger.warning("修飾快取讀取失敗: %s", e)
+            return
+        if not isinstance(data, dict):
+            logger.warning("修飾快取格式錯誤，忽略: %s", self.path)
+            return
+        with self._lock:
+            self._entries = OrderedDict(list(data.items())[-self.max_size:])
+            self._dirty = False
+        logger.info("修飾快取已載入: %d 筆", len(self._entries))
+
+    def clear(self):
+        """清空快取並刪除快取檔（關閉快取時不留下口述內容）"""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = False
+        if self.path:
+            try:
+                self.path.unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning("修飾快取刪除失敗: %s", e)
+
+    def save(self):
+        """有變更時寫入檔案（暫存檔 + os.replace）"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._entries, ensure_ascii=False).encode("utf-8")
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("修飾快取寫入失敗: %s", e)
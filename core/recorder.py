@@ -6,37 +6,89 @@
 import numpy as np
 import sounddevice as sd
 import logging
+import sys
 import threading
 import io
 import wave
 
+from core.winthread import raise_thread_priority
+
 logger = logging.getLogger("VoiceType.Recorder")
 
 # 錄音參數
 SAMPLE_RATE = 16000  # Whisper 推薦 16kHz
 CHANNELS = 1
 DTYPE = "int16"
+# 每次錄音預先配置的緩衝長度（秒），超過時加倍擴充
+INITIAL_BUFFER_SECONDS = 30
+
+# WASAPI 輸入裝置設定，首次錄音時查詢一次（None = 尚未查詢）
+_wasapi_kwargs: dict | None = None
+
+
+def _wasapi_stream_kwargs() -> dict:
+    """
+    取得 WASAPI 預設輸入裝置的串流參數
+
+    Windows 上改走 WASAPI（而非預設的 MME），並讓 WASAPI 直接轉成 16kHz mono，
+    延遲較低；非 Windows 或查詢失敗時回傳空 dict（使用 PortAudio 預設裝置）
+    """
+    global _wasapi_kwargs
+    if _wasapi_kwargs is not None:
+        return _wasapi_kwargs
+
+    _wasapi_kwargs = {}
+    if sys.platform != "win32":
+        return _wasapi_kwargs
+    try:
+        for hostapi in sd.query_hostapis():
+            if "WASAPI" in hostapi["name"] and hostapi["default_input_device"] >= 0:
+                _wasapi_kwargs = {
+                    "device": hostapi["default_input_device"],
+                    # auto_convert：讓 WASAPI 處理取樣率 / 聲道轉換（共用模式）
+                    "extra_settings": sd.WasapiSettings(auto_convert=True),
+                }
+                break
+    except Exception as e:
+        logger.warning("WASAPI 裝置查詢失敗，使用預設裝置: %s", e)
+    return _wasapi_kwargs
 
 
 class AudioRecorder:
     """Push-to-Talk 錄音器"""
 
     def __init__(self):
-        self._chunks: list[np.ndarray] = []
+        # 錄音緩衝：開始錄音時一次配置，回呼只做複製，避免每個片段都配置記憶體
+        self._buf: np.ndarray | None = None
+        self._write = 0
         self._stream = None
         self._lock = threading.Lock()
+        self._callback_prio_set = False  # 回呼執行緒的優先權是否已提高
 
     def start(self):
         """開始錄音"""
         with self._lock:
-            self._chunks = []
-            self._stream = sd.InputStream(
+            # 上一段錄音的緩衝已交給處理執行緒，這裡配置新的（np.empty 不需清零）
+            self._buf = np.empty(INITIAL_BUFFER_SECONDS * SAMPLE_RATE, dtype=np.int16)
+            self._write = 0
+            self._callback_prio_set = False
+            stream_kwargs = dict(
                 samplerate=SAMPLE_RATE,
                 channels=CHANNELS,
                 dtype=DTYPE,
                 blocksize=1024,
+                latency="low",
                 callback=self._callback,
             )
+            wasapi = _wasapi_stream_kwargs()
+            try:
+                self._stream = sd.InputStream(**stream_kwargs, **wasapi)
+            except Exception as e:
+                if not wasapi:
+                    raise
+                logger.warning("WASAPI 錄音開啟失敗，改用預設裝置: %s", e)
+                wasapi.clear()  # 之後的錄音直接使用預設裝置
+                self._stream = sd.InputStream(**stream_kwargs)
             self._stream.start()
 
     def stop(self) -> np.ndarray:
@@ -47,30 +99,128 @@ class AudioRecorder:
                 self._stream.close()
                 self._stream = None
 
-            if not self._chunks:
+            if self._buf is None or not self._write:
+                self._buf = None
                 return np.array([], dtype=np.int16)
 
-            audio = np.concatenate(self._chunks, axis=0).flatten()
-            self._chunks = []
+            # 直接回傳已寫入部分的 view，不再複製；緩衝交由呼叫端持有
+            audio = self._buf[:self._write]
+            self._buf = None
+            self._write = 0
             return audio
 
     def _callback(self, indata, frames, time_info, status):
-        """sounddevice 回呼：收集音訊片段"""
+        """sounddevice 回呼：將音訊片段寫入預先配置的緩衝"""
+        if not self._callback_prio_set:
+            # 回呼在 PortAudio 的執行緒上執行，第一次進來時提高優先權
+            self._callback_prio_set = True
+            raise_thread_priority()
         if status:
             logger.warning("錄音狀態: %s", status)
-        self._chunks.append(indata.copy())
+        buf = self._buf
+        if buf is None:
+            return
+        end = self._write + frames
+        if end > len(buf):
+            # 錄音超過預先配置的長度：加倍擴充（罕見，長時間錄音才會發生）
+            grown = np.empty(max(end, len(buf) * 2), dtype=np.int16)
+            grown[:self._write] = buf[:self._write]
+            self._buf = buf = grown
+        buf[self._write:end] = indata[:, 0]
+        self._write = end
 
     @property
     def is_recording(self) -> bool:
         return self._stream is not None and self._stream.active
 
 
+def to_whisper_pcm(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """確保音訊為 int16 / 16kHz / mono（Whisper 原生格式，上傳量最小）
+
+    錄音器本身即以此格式錄製，此時直接回傳原陣列；
+    其他來源的音訊（float、int32 等其他位元深度、多聲道、其他取樣率）才會轉換。
+    """
+    # 依來源格式換算到 int16 範圍：float 為 [-1, 1]；其他整數格式依位元數縮放
+    # （例如 int32 右移 16 位元），無號整數（如 uint8 WAV）先減去中點
+    if np.issubdtype(audio.dtype, np.floating):
+        offset, scale = 0, 32767
+    elif audio.dtype == np.int16:
+        offset, scale = 0, 1
+    else:
+        info = np.iinfo(audio.dtype)
+        half = (int(info.max) - int(info.min) + 1) // 2
+        offset, scale = int(info.min) + half, 32768 / half
+
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)  # 多聲道 → mono
+
+    if sample_rate != SAMPLE_RATE and len(audio):
+        # 線性內插重新取樣（語音辨識用途已足夠，避免引入 scipy）
+        n_out = int(round(len(audio) * SAMPLE_RATE / sample_rate))
+        positions = np.linspace(0, len(audio) - 1, n_out)
+        audio = np.interp(positions, np.arange(len(audio)), audio)
+
+    if audio.dtype != np.int16:
+        audio = (audio.astype(np.float64) - offset) * scale
+        audio = np.clip(audio, -32768, 32767).astype(np.int16)
+    return audio
+
+
 def audio_to_wav_bytes(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
-    """將 numpy int16 音訊轉為 WAV bytes（供 API 上傳用）"""
+    """將音訊轉為 int16 / 16kHz / mono WAV bytes（供 API 上傳用）"""
+    audio = to_whisper_pcm(audio, sample_rate)
     buf = io.BytesIO()
     with wave.open(buf, "wb") as wf:
         wf.setnchannels(CHANNELS)
         wf.setsampwidth(2)  # int16 = 2 bytes
-        wf.setframerate(sample_rate)
+        wf.setframerate(SAMPLE_RATE)
         wf.writeframes(audio.tobytes())
     return buf.getvalue()
+
+
+# Opus 上傳位元率（語音用途 16 kbps 已足夠，約為 16kHz WAV 的 1/16）
+OPUS_BITRATE = 16000
+
+# Opus 編碼是否可用（None = 尚未檢查；需要選用套件 PyAV）
+_opus_available: bool | None = None
+
+
+def audio_to_opus_bytes(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """將音訊編碼為 Ogg/Opus bytes（需要 PyAV）"""
+    import av
+
+    audio = to_whisper_pcm(audio, sample_rate)
+    buf = io.BytesIO()
+    with av.open(buf, "w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=SAMPLE_RATE)
+        stream.bit_rate = OPUS_BITRATE
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(audio.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+        # 編碼器會自行切成 Opus 所需的 frame 大小；最後送 None 清出剩餘封包
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buf.getvalue()
+
+
+def audio_to_upload(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> tuple[str, bytes, str]:
+    """
+    將音訊編碼為上傳用的 (檔名, bytes, MIME) tuple
+
+    有安裝 PyAV 時壓縮成 Opus（上傳量約少 10 倍），否則或編碼失敗時使用 WAV
+    """
+    global _opus_available
+    if _opus_available is None:
+        import importlib.util
+        _opus_available = importlib.util.find_spec("av") is not None
+
+    if _opus_available:
+        try:
+            return ("recording.ogg", audio_to_opus_bytes(audio, sample_rate), "audio/ogg")
+        except Exception as e:
+            # 例如 FFmpeg 未編入 libopus：之後都直接用 WAV
+            logger.warning("Opus encoding failed, falling back to WAV: %s", e)
+            _opus_available = False
+    return ("recording.wav", audio_to_wav_bytes(audio, sample_rate), "audio/wav")
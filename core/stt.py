@@ -3,78 +3,157 @@
 支援 Groq Whisper、OpenAI Whisper、本地 Whisper
 """
 
-import io
 import logging
+import os
+import sys
+import threading
 import numpy as np
-from core.recorder import audio_to_wav_bytes
+from config.settings import GROQ_BASE_URL
+from core.net import get_http_client
 
 logger = logging.getLogger("VoiceType.STT")
 
 # Whisper 使用 ISO 639-1 語言碼
 LANGUAGE_MAP = {"zh-TW": "zh", "zh-CN": "zh", "en": "en", "ja": "ja"}
 
+# 本地 VAD：靜音超過此長度（毫秒）的片段不送入解碼器
+LOCAL_VAD_MIN_SILENCE_MS = 500
+
+# Whisper prompt 上限（Groq 限制 896 bytes，保留一點餘裕）
+WHISPER_PROMPT_MAX_BYTES = 890
+
+
+def build_whisper_prompt(dictionary: list[str]) -> str | None:
+    """組合自訂詞彙作為 Whisper prompt，超過上限時以完整詞彙為單位截斷"""
+    if not dictionary:
+        return None
+
+    # 用逗號分隔（1 byte）而非「、」（3 bytes）節省空間
+    joined = ",".join(dictionary)
+    if len(joined.encode("utf-8")) <= WHISPER_PROMPT_MAX_BYTES:
+        return joined
+
+    # 超過上限：累加每個詞的 byte 數（含逗號），二分搜尋可容納的詞數
+    sizes = np.fromiter(
+        (len(word.encode("utf-8")) + 1 for word in dictionary),
+        dtype=np.int64, count=len(dictionary),
+    )
+    cumulative = np.cumsum(sizes) - 1  # 前 i+1 個詞以逗號串接後的 bytes
+    count = int(np.searchsorted(cumulative, WHISPER_PROMPT_MAX_BYTES, side="right"))
+    logger.warning("Dictionary prompt truncated at %d bytes (limit 896)",
+                   int(cumulative[count - 1]) if count else 0)
+    return ",".join(dictionary[:count]) if count else None
+
 
 class SpeechToText:
     """語音轉文字引擎"""
 
+    # 延遲載入的 SDK 符號：保留函式內 import 以加快啟動，首次使用後快取於類別
+    _OpenAI = None
+    _WhisperModel = None
+
     def __init__(self, settings):
         self.settings = settings
-
-    def transcribe(self, audio: np.ndarray) -> str:
-        """將音訊轉為文字"""
-        cfg = self.settings.get_config()
+        # 快取 API 客戶端，重複使用連線池（避免每次辨識都重新 TLS 握手）
+        self._clients: dict[tuple, object] = {}
+        self._whisper_prompt = None
+        self._prompt_rev = -1
+        self._prompt_words: tuple[str, ...] | None = None
+        # 本地模型 (名稱, 實例)；預熱與辨識可能同時載入，以鎖確保只建立一次
+        self._local_model: tuple[str, object] | None = None
+        self._local_model_lock = threading.Lock()
+        # 建立時就先組好 prompt（元件在背景預熱時建立），第一次辨識不必計算
+        self._refresh_prompt()
+
+    def _refresh_prompt(self) -> str | None:
+        """取得自訂詞彙 prompt：設定變更且詞彙清單確實不同時才重新組合"""
+        if self._prompt_rev != self.settings.revision:
+            self._prompt_rev = self.settings.revision
+            words = tuple(self.settings.config.get("dictionary", []))
+            if words != self._prompt_words:
+                self._whisper_prompt = build_whisper_prompt(list(words))
+                self._prompt_words = words
+        return self._whisper_prompt
+
+    def transcribe(self, audio: np.ndarray, upload_future=None) -> str:
+        """將音訊轉為文字
+
+        Args:
+            audio: int16 / 16kHz / mono 音訊
+            upload_future: 已在背景編碼中的上傳檔案（concurrent.futures.Future，
+                           結果為 audio_to_upload 的 tuple），未提供時於此處同步編碼
+        """
+        cfg = self.settings.config
         provider = cfg.get("sttProvider", "groq")
         model = cfg.get("sttModel", "whisper-large-v3-turbo")
         language = cfg.get("language", "auto")
-        dictionary = cfg.get("dictionary", [])
-
-        # 組合自訂詞彙作為 Whisper prompt（Groq 限制 896 bytes）
-        whisper_prompt = None
-        if dictionary:
-            # 用逗號分隔（1 byte）而非「、」（3 bytes）節省空間
-            parts = []
-            current_bytes = 0
-            for word in dictionary:
-                word_bytes = len(word.encode("utf-8"))
-                sep_bytes = 1 if parts else 0  # 逗號 1 byte
-                if current_bytes + sep_bytes + word_bytes > 890:
-                    logger.warning("Dictionary prompt truncated at %d bytes (limit 896)", current_bytes)
-                    break
-                parts.append(word)
-                current_bytes += sep_bytes + word_bytes
-            whisper_prompt = ",".join(parts) if parts else None
+        whisper_prompt = self._refresh_prompt()
 
         if provider == "groq":
-            return self._transcribe_groq(audio, model, language, whisper_prompt)
+            return self._transcribe_groq(audio, model, language, whisper_prompt, upload_future)
         elif provider == "openai":
-            return self._transcribe_openai(audio, model, language, whisper_prompt)
+            return self._transcribe_openai(audio, model, language, whisper_prompt, upload_future)
         elif provider == "local":
             return self._transcribe_local(audio, model, language)
         else:
             raise ValueError(f"不支援的 STT 引擎: {provider}")
 
+    @staticmethod
+    def _load_openai():
+        """取得 OpenAI 類別（首次呼叫時才 import）"""
+        if SpeechToText._OpenAI is None:
+            from openai import OpenAI
+            SpeechToText._OpenAI = OpenAI
+        return SpeechToText._OpenAI
+
+    def _get_openai_client(self, provider: str, api_key: str, base_url: str | None = None):
+        """取得（或建立）OpenAI 相容客戶端，以 (provider, api_key, base_url) 為快取鍵"""
+        key = (provider, api_key, base_url)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._load_openai()(
+                api_key=api_key, base_url=base_url, http_client=get_http_client())
+            self._clients[key] = client
+        return client
+
+    def prewarm(self):
+        """預先建立客戶端並打開 TLS 連線（或載入本地模型），縮短第一次辨識的延遲"""
+        cfg = self.settings.config
+        provider = cfg.get("sttProvider", "groq")
+        if provider == "local":
+            self._load_local_model(cfg.get("sttModel", "whisper-large-v3-turbo"))
+            return
+
+        api_key = self.settings.get_api_key(provider)
+        if provider not in ("groq", "openai") or not api_key:
+            return
+        base_url = GROQ_BASE_URL if provider == "groq" else None
+        client = self._get_openai_client(provider, api_key, base_url)
+        # 輕量請求，只為了完成 DNS + TCP + TLS，連線會留在客戶端的連線池
+        client.with_options(timeout=5.0).models.list()
+        logger.info("STT 連線已預熱: %s", provider)
+
+    @staticmethod
+    def _upload_file(audio, upload_future):
+        """取得上傳用的 (檔名, bytes, MIME) tuple，OpenAI SDK 可直接接受"""
+        if upload_future:
+            return upload_future.result()
+        from core.recorder import audio_to_upload  # 延遲載入：匯入 stt 時不必載入 sounddevice
+        return audio_to_upload(audio)
+
     # ── Groq Whisper ─────────────────────────────────────────────────────────
 
-    def _transcribe_groq(self, audio, model, language, prompt):
+    def _transcribe_groq(self, audio, model, language, prompt, upload_future=None):
         """使用 Groq API 進行語音辨識（OpenAI 相容介面）"""
-        from openai import OpenAI
-
         api_key = self.settings.get_api_key("groq")
         if not api_key:
             raise ValueError("Groq API Key 未設定")
 
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.groq.com/openai/v1",
-        )
-
-        wav_bytes = audio_to_wav_bytes(audio)
-        audio_file = io.BytesIO(wav_bytes)
-        audio_file.name = "recording.wav"
+        client = self._get_openai_client("groq", api_key, GROQ_BASE_URL)
 
         kwargs = {
             "model": model,
-            "file": audio_file,
+            "file": self._upload_file(audio, upload_future),
             "response_format": "text",
         }
         if language and language != "auto":
@@ -88,23 +167,17 @@ class SpeechToText:
 
     # ── OpenAI Whisper ───────────────────────────────────────────────────────
 
-    def _transcribe_openai(self, audio, model, language, prompt):
+    def _transcribe_openai(self, audio, model, language, prompt, upload_future=None):
         """使用 OpenAI Whisper API"""
-        from openai import OpenAI
-
         api_key = self.settings.get_api_key("openai")
         if not api_key:
             raise ValueError("OpenAI API Key 未設定")
 
-        client = OpenAI(api_key=api_key)
-
-        wav_bytes = audio_to_wav_bytes(audio)
-        audio_file = io.BytesIO(wav_bytes)
-        audio_file.name = "recording.wav"
+        client = self._get_openai_client("openai", api_key)
 
         kwargs = {
             "model": model,
-            "file": audio_file,
+            "file": self._upload_file(audio, upload_future),
             "response_format": "text",
         }
         if language and language != "auto":
@@ -117,29 +190,62 @@ class SpeechToText:
 
     # ── 本地 Whisper ─────────────────────────────────────────────────────────
 
+    def _load_local_model(self, model):
+        """載入並快取本地 faster-whisper 模型（多執行緒同時呼叫時只載入一次）"""
+        cached = self._local_model
+        if cached is None or cached[0] != model:
+            with self._local_model_lock:
+                cached = self._local_model
+                if cached is None or cached[0] != model:
+                    cached = (model, self._create_local_model(model))
+                    self._local_model = cached
+        return cached[1]
+
+    def _create_local_model(self, model):
+        """建立 faster-whisper 模型實例（需持有 _local_model_lock）"""
+        if SpeechToText._WhisperModel is None:
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                if getattr(sys, "frozen", False):
+                    raise ImportError(
+                        "此版本的 VoiceType.exe 未包含本地 Whisper，請改用雲端 STT，"
+                        "或以 python build.py --with-local-stt 自行打包"
+                    )
+                raise ImportError(
+                    "本地 Whisper 需要安裝 faster-whisper：\n"
+                    "pip install faster-whisper --break-system-packages"
+                )
+            SpeechToText._WhisperModel = WhisperModel
+        WhisperModel = SpeechToText._WhisperModel
+
+        logger.info("載入本地 Whisper 模型: %s ...", model)
+        # int8 量化：比 fp16/fp32 快且記憶體用量約 1/4；模型存放在設定目錄，不重複下載
+        return WhisperModel(
+            model,
+            device="auto",
+            compute_type="int8",
+            download_root=str(self.settings.config_dir / "models"),
+            cpu_threads=max(1, (os.cpu_count() or 2) // 2),
+            num_workers=1,
+        )
+
     def _transcribe_local(self, audio, model, language):
         """使用本地 faster-whisper 模型"""
-        try:
-            from faster_whisper import WhisperModel
-        except ImportError:
-            raise ImportError(
-                "本地 Whisper 需要安裝 faster-whisper：\n"
-                "pip install faster-whisper --break-system-packages"
-            )
-
-        # 快取模型實例
-        if not hasattr(self, "_local_model") or self._local_model_name != model:
-            logger.info("載入本地 Whisper 模型: %s ...", model)
-            self._local_model = WhisperModel(model, device="auto", compute_type="auto")
-            self._local_model_name = model
+        local_model = self._load_local_model(model)
 
         # faster-whisper 需要 float32 音訊
         audio_f32 = audio.astype(np.float32) / 32768.0
 
-        kwargs = {"beam_size": 5}
+        # VAD 過濾靜音片段（放開快捷鍵前的停頓不必解碼）
+        kwargs = {
+            "beam_size": 5,
+            "vad_filter": True,
+            "vad_parameters": {"min_silence_duration_ms": LOCAL_VAD_MIN_SILENCE_MS},
+        }
         if language and language != "auto":
             kwargs["language"] = LANGUAGE_MAP.get(language, language)
 
-        segments, info = self._local_model.transcribe(audio_f32, **kwargs)
+        segments, info = local_model.transcribe(audio_f32, **kwargs)
         text = " ".join(seg.text for seg in segments)
         return text.strip()
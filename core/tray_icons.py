@@ -3,6 +3,8 @@
 依應用程式狀態產生不同顏色的圖標
 """
 
+import functools
+
 from PIL import Image, ImageDraw
 
 # 狀態 → 背景顏色
@@ -14,8 +16,12 @@ STATE_COLORS = {
 }
 
 
+@functools.lru_cache(maxsize=8)
 def create_tray_icon(state: str = "idle", size: int = 64) -> Image.Image:
-    """依狀態產生系統列圖標（麥克風圖案 + 狀態色背景）"""
+    """依狀態產生系統列圖標（麥克風圖案 + 狀態色背景）
+
+    結果會快取，同一狀態回傳同一個 Image 物件，呼叫端不可修改
+    """
     color = STATE_COLORS.get(state, STATE_COLORS["idle"])
 
     img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
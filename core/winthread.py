@@ -0,0 +1,24 @@
+"""
+執行緒優先權工具
+提高錄音回呼與語音處理執行緒的排程優先權，系統忙碌時減少被搶佔的延遲
+"""
+
+import ctypes
+import logging
+import sys
+
+logger = logging.getLogger("VoiceType.Thread")
+
+THREAD_PRIORITY_ABOVE_NORMAL = 1
+
+
+def raise_thread_priority(priority: int = THREAD_PRIORITY_ABOVE_NORMAL) -> bool:
+    """提高目前執行緒的優先權（僅 Windows），成功回傳 True"""
+    if sys.platform != "win32":
+        return False
+    try:
+        kernel32 = ctypes.windll.kernel32
+        return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), priority))
+    except Exception as e:
+        logger.debug("SetThreadPriority failed: %s", e)
+        return False
@@ -8,40 +8,87 @@ VoiceType - 類 Typeless 語音輸入工具
   3. 按住 Right Alt 說話，放開即輸出
 """
 
-import ctypes
-# 在 import sounddevice 之前初始化 COM 為 STA 模式
-# 避免 PortAudio 將 COM 初始化為 MTA，導致 SendInput 無法被 Chrome 接收
-ctypes.windll.ole32.CoInitializeEx(None, 2)  # COINIT_APARTMENTTHREADED
-
-# ── 單實例鎖 ─────────────────────────────────────────────────────────────────
-# 使用 Windows Named Mutex 確保只有一個 VoiceType 在執行
-_mutex = ctypes.windll.kernel32.CreateMutexW(None, True, "Global\\VoiceType_SingleInstance")
-if ctypes.windll.kernel32.GetLastError() == 183:  # ERROR_ALREADY_EXISTS
-    ctypes.windll.user32.MessageBoxW(
-        None, "VoiceType 已在執行中。\n請檢查系統托盤。", "VoiceType", 0x40
-    )
-    raise SystemExit(0)
-
 import atexit
+import concurrent.futures
+import ctypes
+from ctypes import wintypes
+import functools
+import json
 import threading
 import os
 import sys
 import time
 import logging
 
-from core.recorder import AudioRecorder
-from core.stt import SpeechToText
-from core.llm import LLMProcessor
-from core.injector import TextInjector
+# 錄音（sounddevice / numpy）、STT、LLM、注入、托盤圖標（PIL）模組在首次使用時才載入，
+# 讓托盤圖標盡快出現；錄音模組會在啟動後於背景預先載入
+from core.net import close_http_client
+from core.polish_cache import PolishCache
+from core.winthread import raise_thread_priority
 from core.hotkey import HotkeyManager
-from core.tray_icons import create_tray_icon
 from core.sounds import play_start, play_stop
 from config.settings import Settings
 
 # ── 常數 ─────────────────────────────────────────────────────────────────────
 MIN_RECORDING_SECONDS = 0.3
-INJECT_DELAY_SECONDS = 0.3
+# 注入前等待條件成立（焦點切換、Alt 放開）的輪詢間隔與上限
+WAIT_POLL_SECONDS = 0.005
+FOCUS_WAIT_TIMEOUT = 0.1
+KEY_RELEASE_WAIT_TIMEOUT = 0.2
+VK_MENU = 0x12
 ERROR_DISPLAY_SECONDS = 3
+# 單次語音處理的最長秒數，超過即強制恢復 hook
+PROCESSING_TIMEOUT_SECONDS = 30.0
+# 連線閒置超過此秒數，按下快捷鍵時就先在背景重新預熱（伺服器端可能已關閉閒置連線）
+NETWORK_REWARM_IDLE_SECONDS = 60
+
+# 單實例鎖的 mutex handle（_init_process 建立，程式執行期間保持持有）
+_mutex = None
+
+# ── Win32 API ─────────────────────────────────────────────────────────────────
+# 預先取得函式並宣告型別：呼叫時不必每次經 windll 屬性查找，
+# HWND / HANDLE 也以指標寬度傳遞，64 位元下不會被截成 int
+if sys.platform == "win32":
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+    _GetForegroundWindow = _user32.GetForegroundWindow
+    _GetForegroundWindow.argtypes = []
+    _GetForegroundWindow.restype = wintypes.HWND
+    _SetForegroundWindow = _user32.SetForegroundWindow
+    _SetForegroundWindow.argtypes = [wintypes.HWND]
+    _SetForegroundWindow.restype = wintypes.BOOL
+    _GetWindowThreadProcessId = _user32.GetWindowThreadProcessId
+    _GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+    _GetWindowThreadProcessId.restype = wintypes.DWORD
+    _IsWindow = _user32.IsWindow
+    _IsWindow.argtypes = [wintypes.HWND]
+    _IsWindow.restype = wintypes.BOOL
+    _IsIconic = _user32.IsIconic
+    _IsIconic.argtypes = [wintypes.HWND]
+    _IsIconic.restype = wintypes.BOOL
+    _ShowWindow = _user32.ShowWindow
+    _ShowWindow.argtypes = [wintypes.HWND, ctypes.c_int]
+    _ShowWindow.restype = wintypes.BOOL
+    _AttachThreadInput = _user32.AttachThreadInput
+    _AttachThreadInput.argtypes = [wintypes.DWORD, wintypes.DWORD, wintypes.BOOL]
+    _AttachThreadInput.restype = wintypes.BOOL
+    _GetAsyncKeyState = _user32.GetAsyncKeyState
+    _GetAsyncKeyState.argtypes = [ctypes.c_int]
+    _GetAsyncKeyState.restype = wintypes.SHORT
+
+    _GetCurrentThreadId = _kernel32.GetCurrentThreadId
+    _GetCurrentThreadId.argtypes = []
+    _GetCurrentThreadId.restype = wintypes.DWORD
+    _OpenThread = _kernel32.OpenThread
+    _OpenThread.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    _OpenThread.restype = wintypes.HANDLE
+    _GetExitCodeThread = _kernel32.GetExitCodeThread
+    _GetExitCodeThread.argtypes = [wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD)]
+    _GetExitCodeThread.restype = wintypes.BOOL
+    _CloseHandle = _kernel32.CloseHandle
+    _CloseHandle.argtypes = [wintypes.HANDLE]
+    _CloseHandle.restype = wintypes.BOOL
 
 # ── Logging ───────────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -52,22 +99,66 @@ logging.basicConfig(
 logger = logging.getLogger("VoiceType")
 
 
+def _elapsed(start_ns: int, end_ns: int) -> float:
+    """perf_counter_ns 區間轉為秒（保留到毫秒）"""
+    return round((end_ns - start_ns) / 1e9, 3)
+
+
 class VoiceType:
     """主應用程式類別"""
 
     def __init__(self):
-        self.settings = Settings()
-        self.recorder = AudioRecorder()
-        self.stt = SpeechToText(self.settings)
-        self.llm = LLMProcessor(self.settings)
-        self.injector = TextInjector(self.settings)
+        self.settings = Settings(autoload=True)
+        self.polish_cache = PolishCache(self.settings.config_dir / "polish_cache.json")
+        self.polish_cache.load()
         self.hotkey = HotkeyManager(self.settings)
         self._state_lock = threading.RLock()  # 執行緒安全狀態鎖
         self.is_recording = False
         self.processing = False
         self.tray_icon = None
+        self._tray_state = None   # 目前托盤圖標的狀態
+        self._tray_title = None   # 目前托盤提示文字
         self._target_hwnd = None
         self._target_thread_id = None
+        self._last_network_use = 0.0  # 上次使用 STT / LLM 連線的時間（time.monotonic）
+        self._quit_event = threading.Event()  # 主執行緒在此等待，設定後結束程式
+        self._console_handler = None  # 主控台 Ctrl+C 處理函式（須保留參考避免被回收）
+        # 放開快捷鍵後立即在背景編碼上傳音訊（Opus 或 WAV），與處理執行緒啟動重疊
+        self._upload_encoder = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="VoiceType-Encode"
+        )
+        # 常駐的處理執行緒（COM 初始化、優先權只需設定一次）與監看處理逾時的執行緒
+        self._processor = self._new_processor()
+        self._watchdog = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="VoiceType-Watchdog"
+        )
+
+    # ── 延遲建立的元件 ───────────────────────────────────────────────────────
+
+    @functools.cached_property
+    def recorder(self):
+        from core.recorder import AudioRecorder
+        return AudioRecorder()
+
+    @functools.cached_property
+    def stt(self):
+        from core.stt import SpeechToText
+        return SpeechToText(self.settings)
+
+    @functools.cached_property
+    def llm(self):
+        from core.llm import LLMProcessor
+        return LLMProcessor(self.settings, cache=self.polish_cache)
+
+    @functools.cached_property
+    def injector(self):
+        from core.injector import TextInjector
+        return TextInjector(self.settings)
+
+    def _reset_components(self, *names):
+        """丟棄已建立的元件，下次使用時依新設定重建"""
+        for name in names:
+            self.__dict__.pop(name, None)
 
     # ── 快捷鍵回呼 ───────────────────────────────────────────────────────────
 
@@ -78,12 +169,19 @@ class VoiceType:
                 return
             self.is_recording = True
         # 記住目前的前景視窗（使用者正在操作的視窗）
-        self._target_hwnd = ctypes.windll.user32.GetForegroundWindow()
+        self._target_hwnd = _GetForegroundWindow() or 0  # 沒有前景視窗時為 NULL（None）
         # 取得該視窗的執行緒 ID，用於 AttachThreadInput
-        self._target_thread_id = ctypes.windll.user32.GetWindowThreadProcessId(self._target_hwnd, None)
+        self._target_thread_id = _GetWindowThreadProcessId(self._target_hwnd, None)
         play_start()
         self.recorder.start()
         logger.info("Recording started (target hwnd: 0x%x)...", self._target_hwnd)
+
+        # 使用者說話的同時重建閒置過久的連線，放開後上傳音訊不必再等 TLS 握手
+        if time.monotonic() - self._last_network_use > NETWORK_REWARM_IDLE_SECONDS:
+            self._last_network_use = time.monotonic()
+            threading.Thread(
+                target=self._prewarm_network, args=(self.settings.config,), daemon=True
+            ).start()
         self._update_tray("錄音中...", "recording")
 
     def on_hotkey_release(self):
@@ -96,33 +194,49 @@ class VoiceType:
         play_stop()
 
         audio_data = self.recorder.stop()
+        # 雲端 STT 需要上傳音訊檔：先送去背景編碼，本地 Whisper 則直接用 PCM
+        upload_future = None
+        if self.settings.config.get("sttProvider", "groq") != "local":
+            from core.recorder import audio_to_upload
+            upload_future = self._upload_encoder.submit(audio_to_upload, audio_data)
         logger.info("Recording stopped (%.1f sec), processing...", len(audio_data) / 16000)
         self._update_tray("處理中...", "processing")
 
-        # 使用帶超時的背景執行緒
-        thread = threading.Thread(
-            target=self._process_audio_with_watchdog,
-            args=(audio_data,),
-            daemon=True
-        )
-        thread.start()
+        # 交給常駐處理執行緒，並由監看執行緒做超時保護
+        future = self._processor.submit(self._process_audio, audio_data, upload_future)
+        self._watchdog.submit(self._watch_processing, future)
 
     # ── 語音處理管線 ─────────────────────────────────────────────────────────
 
-    def _process_audio_with_watchdog(self, audio_data):
-        """包裝器，帶超時保護"""
-        import concurrent.futures
+    @staticmethod
+    def _init_processing_thread():
+        """處理執行緒啟動時執行一次"""
+        # 背景執行緒也需要初始化 COM 為 STA
+        ctypes.windll.ole32.CoInitializeEx(None, 2)
+        # 處理管線在關鍵路徑上，提高優先權避免系統忙碌時被搶佔
+        raise_thread_priority()
+
+    def _new_processor(self):
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="VoiceType-Process",
+            initializer=self._init_processing_thread,
+        )
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(self._process_audio, audio_data)
-            try:
-                future.result(timeout=30.0)  # 30 秒最大限制
-            except concurrent.futures.TimeoutError:
-                logger.error("Processing timeout after 30s - forcing hook recovery")
-                self._emergency_hook_recovery()
-            except Exception as e:
-                logger.error("Processing error: %s", e, exc_info=True)
-                self._emergency_hook_recovery()
+    def _watch_processing(self, future):
+        """等待處理結果，逾時或失敗時強制恢復 hook"""
+        try:
+            future.result(timeout=PROCESSING_TIMEOUT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            logger.error("Processing timeout after %ds - forcing hook recovery",
+                         PROCESSING_TIMEOUT_SECONDS)
+            # 卡住的執行緒無法中止，改用新的處理執行緒，之後的語音不會排在它後面
+            stuck, self._processor = self._processor, self._new_processor()
+            stuck.shutdown(wait=False)
+            self._emergency_hook_recovery()
+        except Exception as e:
+            logger.error("Processing error: %s", e, exc_info=True)
+            self._emergency_hook_recovery()
 
     def _emergency_hook_recovery(self):
         """緊急 hook 恢復"""
@@ -145,11 +259,10 @@ class VoiceType:
 
         self._update_tray("就緒", "idle")
 
-    def _process_audio(self, audio_data):
-        """STT → LLM → 焦點恢復 → unhook → 注入 → rehook"""
-        # 背景執行緒也需要初始化 COM 為 STA
-        ctypes.windll.ole32.CoInitializeEx(None, 2)
+    def _process_audio(self, audio_data, upload_future=None):
+        """STT → LLM → 焦點恢復 → unhook → 注入 → rehook（在常駐處理執行緒上執行）"""
         hook_unhooked = False
+        failed = False
 
         try:
             # 檢查錄音長度
@@ -160,22 +273,30 @@ class VoiceType:
                 return
 
             # 步驟 1：語音轉文字
-            t0 = time.time()
-            raw_text = self.stt.transcribe(audio_data)
-            stt_time = time.time() - t0
+            # 各階段耗時記在 stats，完成後只輸出一行摘要
+            stats = {"audio_s": round(duration, 2)}
+            t0 = time.perf_counter_ns()
+            raw_text = self.stt.transcribe(audio_data, upload_future=upload_future)
+            t1 = time.perf_counter_ns()
+            stats["stt_s"] = _elapsed(t0, t1)
+            self._last_network_use = time.monotonic()
 
             if not raw_text or not raw_text.strip():
-                logger.warning("No text recognized")
+                logger.warning("No text recognized (%.1fs)", stats["stt_s"])
                 self._reset_status()
                 return
 
-            logger.info("Raw text (%.1fs): %s", stt_time, raw_text)
-
-            # 步驟 2：LLM 智能修飾
-            t1 = time.time()
-            polished = self.llm.polish(raw_text, target_hwnd=self._target_hwnd)
-            llm_time = time.time() - t1
-            logger.info("Polished (%.1fs): %s", llm_time, polished)
+            # 步驟 2：LLM 智能修飾（短句、無口頭禪時 polish 直接回傳原文，不呼叫 LLM）
+            first_token = []  # 記錄第一段串流輸出的時間點（跳過 LLM 時不會有）
+            polished = self.llm.polish(
+                raw_text, target_hwnd=self._target_hwnd,
+                on_token=lambda token: first_token or first_token.append(time.perf_counter_ns()),
+            )
+            t2 = time.perf_counter_ns()
+            stats["llm_s"] = _elapsed(t1, t2)
+            if first_token:
+                stats["llm_first_token_s"] = _elapsed(t1, first_token[0])
+                self._last_network_use = time.monotonic()
 
             # ==========================================
             # 關鍵修復：恢復焦點 BEFORE unhook
@@ -186,20 +307,17 @@ class VoiceType:
                 focus_success = self._restore_focus(self._target_hwnd)
                 if not focus_success:
                     logger.warning("Focus restoration failed, but continuing with injection")
-                time.sleep(0.05)  # 讓焦點穩定
 
-            # 步驟 4：發送 Escape 鍵（取消 Alt 選單，現在發送到正確視窗）
+            # 步驟 4：等 Alt 實際放開後發送 Escape 鍵（取消 Alt 選單，現在發送到正確視窗）
+            self._wait_until(self._alt_released, KEY_RELEASE_WAIT_TIMEOUT)
             try:
-                import pyautogui
-                pyautogui.press("escape")
-                time.sleep(0.02)
+                self.injector.send_escape()
             except Exception as e:
                 logger.warning("Failed to send escape: %s", e)
 
-            # 步驟 5：暫時 unhook（僅在注入期間）
+            # 步驟 5：暫時 unhook（僅在注入期間，unhook 會等到 hook 確實移除才返回）
             self.hotkey.unhook()
             hook_unhooked = True
-            time.sleep(0.05)  # 短暫暫停
 
             # 步驟 6：注入文字
             self.injector.inject(polished)
@@ -211,17 +329,18 @@ class VoiceType:
             )
             hook_unhooked = False
 
-            total = time.time() - t0
-            logger.info("Done! Total %.1fs (STT %.1fs + LLM %.1fs)", total, stt_time, llm_time)
+            stats["total_s"] = _elapsed(t0, time.perf_counter_ns())
+            stats["raw"] = raw_text
+            stats["polished"] = polished
+            logger.info("voicetype_utterance %s", json.dumps(stats, ensure_ascii=False))
 
         except Exception as e:
             logger.error("Processing failed: %s", e, exc_info=True)
-            self._update_tray("錯誤", "error")
-            time.sleep(ERROR_DISPLAY_SECONDS)
+            failed = True
 
         finally:
             # 確保 hook 一定會重新註冊
-            if hook_unhooked or not self.hotkey._press_hook:
+            if hook_unhooked or not self.hotkey._hook:
                 try:
                     self.hotkey.register(
                         on_press=self.on_hotkey_press,
@@ -231,7 +350,16 @@ class VoiceType:
                 except Exception as e2:
                     logger.error("Failed to re-register hotkey in finally: %s", e2)
 
-            self._reset_status()
+            if failed:
+                # 錯誤圖標顯示一段時間後自動恢復，期間已可重新錄音
+                with self._state_lock:
+                    self.processing = False
+                self._update_tray("錯誤", "error")
+                timer = threading.Timer(ERROR_DISPLAY_SECONDS, self._clear_error_status)
+                timer.daemon = True
+                timer.start()
+            else:
+                self._reset_status()
 
     # ── 輔助方法 ─────────────────────────────────────────────────────────────
 
@@ -241,19 +369,34 @@ class VoiceType:
             # 在就緒狀態顯示當前模型
             if status_text == "就緒" and state == "idle":
                 model = self._get_current_model()
-                self.tray_icon.title = f"VoiceType - {status_text} ({model})"
+                self._set_tray_title(f"VoiceType - {status_text} ({model})")
             else:
-                self.tray_icon.title = f"VoiceType - {status_text}"
+                self._set_tray_title(f"VoiceType - {status_text}")
+            if state == self._tray_state:
+                return  # 圖標未變，不必重新設定（pystray 每次設定都會重建系統圖示）
             try:
+                from core.tray_icons import create_tray_icon
                 self.tray_icon.icon = create_tray_icon(state)
+                self._tray_state = state
             except Exception:
                 pass  # 圖標更新非關鍵功能
 
+    def _set_tray_title(self, title: str):
+        """提示文字有變才更新（pystray 每次設定都會呼叫 Shell_NotifyIcon）"""
+        if title != self._tray_title:
+            self.tray_icon.title = title
+            self._tray_title = title
+
     def _reset_status(self):
         with self._state_lock:
             self.processing = False
         self._update_tray("就緒", "idle")
 
+    def _clear_error_status(self):
+        """錯誤顯示時間到：仍停在錯誤狀態才恢復就緒（使用者可能已開始下一次錄音）"""
+        if self._tray_state == "error":
+            self._update_tray("就緒", "idle")
+
     def _is_thread_alive(self, thread_id):
         """檢查執行緒 ID 是否仍然有效"""
         if not thread_id:
@@ -261,26 +404,22 @@ class VoiceType:
 
         # 開啟執行緒控制碼
         THREAD_QUERY_INFORMATION = 0x0040
-        h_thread = ctypes.windll.kernel32.OpenThread(
-            THREAD_QUERY_INFORMATION, False, thread_id
-        )
+        h_thread = _OpenThread(THREAD_QUERY_INFORMATION, False, thread_id)
         if not h_thread:
             return False
 
         # 檢查退出碼
-        exit_code = ctypes.c_ulong()
-        ctypes.windll.kernel32.GetExitCodeThread(h_thread, ctypes.byref(exit_code))
-        ctypes.windll.kernel32.CloseHandle(h_thread)
+        exit_code = wintypes.DWORD()
+        _GetExitCodeThread(h_thread, ctypes.byref(exit_code))
+        _CloseHandle(h_thread)
 
         STILL_ACTIVE = 259
         return exit_code.value == STILL_ACTIVE
 
     def _attach_thread_input_safe(self, thread_from, thread_to, attach=True, timeout=1.0):
         """AttachThreadInput with timeout protection"""
-        import concurrent.futures
-
         def do_attach():
-            return ctypes.windll.user32.AttachThreadInput(thread_from, thread_to, attach)
+            return _AttachThreadInput(thread_from, thread_to, attach)
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
             future = executor.submit(do_attach)
@@ -294,30 +433,44 @@ class VoiceType:
                 logger.error("AttachThreadInput failed: %s", e)
                 return False
 
+    @staticmethod
+    def _wait_until(predicate, timeout: float, poll: float = WAIT_POLL_SECONDS) -> bool:
+        """輪詢直到條件成立或逾時，回傳條件是否成立"""
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    @staticmethod
+    def _alt_released() -> bool:
+        """Alt 鍵是否已實際放開"""
+        return not _GetAsyncKeyState(VK_MENU) & 0x8000
+
     def _restore_focus(self, hwnd):
         """使用簡化的焦點恢復（避免死鎖）"""
         try:
-            user32 = ctypes.windll.user32
-
             # 驗證視窗仍然存在
-            if not user32.IsWindow(hwnd):
+            if not _IsWindow(hwnd):
                 logger.warning("Target window no longer exists")
                 return False
 
+            def is_foreground():
+                return _GetForegroundWindow() == hwnd
+
             # 方法 1：簡單 SetForegroundWindow（適用於 90% 情況）
-            user32.SetForegroundWindow(hwnd)
-            time.sleep(0.05)
+            _SetForegroundWindow(hwnd)
 
-            # 驗證成功
-            current_fg = user32.GetForegroundWindow()
-            if current_fg == hwnd:
+            # 驗證成功（焦點切換通常幾毫秒內完成，不必固定等待）
+            if self._wait_until(is_foreground, FOCUS_WAIT_TIMEOUT):
                 logger.info("Focus restored successfully (simple method)")
                 return True
 
             # 方法 2：進階恢復（使用 AttachThreadInput 作為後備）
             logger.info("Simple focus restoration failed, trying advanced method")
 
-            current_thread = ctypes.windll.kernel32.GetCurrentThreadId()
+            current_thread = _GetCurrentThreadId()
             target_thread = self._target_thread_id
 
             # 驗證執行緒存活
@@ -336,20 +489,20 @@ class VoiceType:
 
             try:
                 # 如果被最小化，恢復
-                if user32.IsIconic(hwnd):
-                    user32.ShowWindow(hwnd, 9)  # SW_RESTORE
+                if _IsIconic(hwnd):
+                    _ShowWindow(hwnd, 9)  # SW_RESTORE
                     time.sleep(0.02)
 
                 # 設置前景
-                user32.SetForegroundWindow(hwnd)
-                time.sleep(0.05)
+                _SetForegroundWindow(hwnd)
+                self._wait_until(is_foreground, FOCUS_WAIT_TIMEOUT)
 
             finally:
                 # 確保 detach
                 self._attach_thread_input_safe(current_thread, target_thread, False, timeout=0.5)
 
             # 最終驗證
-            current_fg = user32.GetForegroundWindow()
+            current_fg = _GetForegroundWindow() or 0
             success = (current_fg == hwnd)
             if success:
                 logger.info("Focus restored successfully (advanced method)")
@@ -367,8 +520,13 @@ class VoiceType:
         """建立系統托盤圖示"""
         try:
             import pystray
+            from core.tray_icons import STATE_COLORS, create_tray_icon
 
+            # 預先繪製所有狀態的圖標（create_tray_icon 會快取），切換狀態時直接取用
+            for state in STATE_COLORS:
+                create_tray_icon(state)
             img = create_tray_icon("idle")
+            self._tray_state = "idle"
 
             # 建立模型選擇子選單
             model_menu = pystray.Menu(
@@ -410,7 +568,8 @@ class VoiceType:
                 pystray.MenuItem("結束", self._quit),
             )
 
-            self.tray_icon = pystray.Icon("VoiceType", img, "VoiceType - 就緒", menu)
+            self._tray_title = "VoiceType - 就緒"
+            self.tray_icon = pystray.Icon("VoiceType", img, self._tray_title, menu)
             return self.tray_icon
 
         except ImportError:
@@ -434,12 +593,8 @@ class VoiceType:
     def _reload_settings(self, icon=None, item=None):
         """重新載入設定"""
         self.settings.load()
-        self.stt = SpeechToText(self.settings)
-        self.llm = LLMProcessor(self.settings)
-        self.injector = TextInjector(self.settings)
-        # 重新註冊快捷鍵
-        self.hotkey.stop()
-        self.hotkey = HotkeyManager(self.settings)
+        self._reset_components("stt", "llm", "injector")
+        # 重新註冊快捷鍵（register 會先移除舊 hook，沿用同一個管理器與回呼執行緒）
         self.hotkey.register(
             on_press=self.on_hotkey_press,
             on_release=self.on_hotkey_release,
@@ -448,8 +603,7 @@ class VoiceType:
 
     def _get_current_model(self):
         """取得當前使用的模型"""
-        cfg = self.settings.get_config()
-        return cfg.get("llmModel", "gpt-4.1")
+        return self.settings.config.get("llmModel", "gpt-4.1")
 
     def _switch_model(self, model_name: str):
         """切換 LLM 模型"""
@@ -457,37 +611,56 @@ class VoiceType:
             logger.info("Switching model to: %s", model_name)
             self.settings.update("llmModel", model_name)
             # 重新建立 LLM 處理器
-            self.llm = LLMProcessor(self.settings)
+            self._reset_components("llm")
             # 更新托盤提示文字
             if self.tray_icon:
-                cfg = self.settings.get_config()
-                tooltip = f"VoiceType - 就緒 ({model_name})"
-                self.tray_icon.title = tooltip
+                self._set_tray_title(f"VoiceType - 就緒 ({model_name})")
             logger.info("Model switched to: %s", model_name)
         except Exception as e:
             logger.error("Failed to switch model: %s", e)
 
     def _quit(self, icon=None, item=None):
+        """通知主執行緒結束（可從托盤選單或主控台 Ctrl+C 執行緒呼叫）"""
+        self._quit_event.set()
+
+    def _shutdown(self):
         logger.info("Shutting down VoiceType...")
         self.hotkey.stop()
+        from config.settings_server import stop_settings_server
+        stop_settings_server()
         if self.tray_icon:
             self.tray_icon.stop()
-        sys.exit(0)
+
+    def _install_console_handler(self):
+        """主控台 Ctrl+C / 關閉視窗時設定結束事件（主執行緒阻塞等待時收不到 KeyboardInterrupt）"""
+        handler_type = ctypes.WINFUNCTYPE(ctypes.c_int, ctypes.c_uint)
+
+        def handler(ctrl_type):
+            self._quit()
+            return True
+
+        self._console_handler = handler_type(handler)
+        if not ctypes.windll.kernel32.SetConsoleCtrlHandler(self._console_handler, True):
+            logger.debug("SetConsoleCtrlHandler failed")
 
     # ── 啟動 ─────────────────────────────────────────────────────────────────
 
     def _cleanup(self):
-        """確保程式退出時釋放所有鍵盤 hook，防止鍵盤卡住"""
+        """確保程式退出時釋放所有鍵盤 hook，防止鍵盤卡住，並寫入尚未儲存的設定與快取"""
+        self.settings.close()
+        if self.settings.config.get("polishCache", True):
+            self.polish_cache.save()
+        else:
+            self.polish_cache.clear()
+        close_http_client()
         try:
             self.hotkey.stop()
-            import keyboard
-            keyboard.unhook_all()
             logger.info("Keyboard hooks cleaned up")
         except Exception:
             pass
 
     def run(self):
-        cfg = self.settings.load()
+        cfg = self.settings.config
         hotkey = cfg.get("hotkey", "RightAlt")
 
         logger.info("=" * 55)
@@ -520,12 +693,42 @@ class VoiceType:
             tray_thread = threading.Thread(target=tray.run, daemon=True)
             tray_thread.start()
 
+        # 先啟動處理執行緒（COM 初始化），第一次語音不必等待
+        self._processor.submit(lambda: None)
+
+        # 托盤出現後才背景預熱 STT / LLM 連線（SDK import + DNS + TLS 握手），不拖慢托盤啟動
+        threading.Thread(target=self._prewarm_network, args=(cfg,), daemon=True).start()
+
+        # 托盤出現後才在背景載入錄音模組（sounddevice / PortAudio），第一次按下快捷鍵不必等待
+        threading.Thread(target=self._preload_recorder, daemon=True).start()
+
         logger.info("VoiceType started! Hold %s to speak", hotkey)
+        # 閒置時主執行緒完全不喚醒，直到結束事件被設定
+        self._install_console_handler()
         try:
-            while True:
-                time.sleep(1)
+            self._quit_event.wait()
         except KeyboardInterrupt:
-            self._quit()
+            pass
+        self._shutdown()
+        sys.exit(0)
+
+    def _prewarm_network(self, cfg):
+        """預先建立 STT / LLM 客戶端與連線，失敗不影響正常使用"""
+        logger.info("Prewarming connections: STT=%s, LLM=%s",
+                    cfg.get("sttProvider"), cfg.get("llmProvider"))
+        for name, component in (("STT", self.stt), ("LLM", self.llm)):
+            try:
+                component.prewarm()
+            except Exception as e:
+                logger.warning("%s 預熱失敗（不影響使用）: %s", name, e)
+        self._last_network_use = time.monotonic()
+
+    def _preload_recorder(self):
+        """背景 import 錄音模組，失敗時留到第一次錄音再處理"""
+        try:
+            import core.recorder  # noqa: F401
+        except Exception as e:
+            logger.warning("錄音模組預先載入失敗: %s", e)
 
     def _check_api_keys(self, cfg):
         """啟動時檢查必要的 API Key，如為空則自動開啟設定頁面"""
@@ -546,6 +749,24 @@ class VoiceType:
             self._open_settings()
 
 
+def _init_process():
+    """程式啟動時執行一次：COM 初始化與單實例檢查（import 本模組時不執行，方便測試）"""
+    # 在 import sounddevice 之前初始化 COM 為 STA 模式
+    # 避免 PortAudio 將 COM 初始化為 MTA，導致 SendInput 無法被 Chrome 接收
+    ctypes.windll.ole32.CoInitializeEx(None, 2)  # COINIT_APARTMENTTHREADED
+
+    # ── 單實例鎖 ──
+    # 使用 Windows Named Mutex 確保只有一個 VoiceType 在執行
+    global _mutex
+    _mutex = ctypes.windll.kernel32.CreateMutexW(None, True, "Global\\VoiceType_SingleInstance")
+    if ctypes.windll.kernel32.GetLastError() == 183:  # ERROR_ALREADY_EXISTS
+        ctypes.windll.user32.MessageBoxW(
+            None, "VoiceType 已在執行中。\n請檢查系統托盤。", "VoiceType", 0x40
+        )
+        raise SystemExit(0)
+
+
 if __name__ == "__main__":
+    _init_process()
     app = VoiceType()
     app.run()
@@ -75,6 +75,37 @@ class TestSettings(unittest.TestCase):
         self.assertEqual(cfg["apiKeys"]["groq"], "test-key")
         self.assertEqual(cfg["dictionary"], ["TestWord"])
 
+    def test_config_json_cached_until_save(self):
+        """設定 JSON 在同一版本內重複使用，儲存後重新編碼"""
+        from config.settings import Settings
+        settings = Settings(config_dir=self.temp_dir)
+        self.addCleanup(settings.close)
+        settings.load()
+
+        first = settings.get_config_json()
+        self.assertIs(settings.get_config_json(), first)
+        self.assertEqual(json.loads(first), settings.get_config())
+
+        settings.update("language", "ja")
+        second = settings.get_config_json()
+        self.assertIsNot(second, first)
+        self.assertEqual(json.loads(second)["language"], "ja")
+
+    def test_autoload_keeps_config_identity(self):
+        """autoload 時建構即載入；重新載入後 config 仍是同一個 dict"""
+        from config.settings import Settings, DEFAULT_CONFIG
+        settings = Settings(config_dir=self.temp_dir, autoload=True)
+        cfg = settings.config
+        self.assertEqual(cfg["sttProvider"], "groq")
+
+        cfg["apiKeys"]["groq"] = "gsk-test"
+        self.assertEqual(DEFAULT_CONFIG["apiKeys"]["groq"], "")
+
+        settings.save()
+        settings.load()
+        self.assertIs(settings.config, cfg)
+        self.assertEqual(cfg["apiKeys"]["groq"], "gsk-test")
+
 
 class TestDictionaryByteLimit(unittest.TestCase):
     """測試字典 byte 容量限制"""
@@ -198,6 +229,241 @@ class TestSTTPromptTruncation(unittest.TestCase):
         self.assertIn("ComfyUI", prompt)
 
 
+    def test_stt_builder_matches_reference(self):
+        """stt.build_whisper_prompt 應與逐詞計算結果一致"""
+        from core.stt import build_whisper_prompt
+        cases = [
+            [],
+            ["GitHub", "Python"],
+            [f"LongWord{i:04d}" for i in range(200)],
+            ["Stable Diffusion", "ComfyUI"] + [f"測試詞彙{i}" for i in range(100)],
+            ["繁" * 300, "GitHub"],
+        ]
+        for words in cases:
+            self.assertEqual(build_whisper_prompt(words), self._build_prompt(words))
+
+    def test_prompt_precomputed_and_rebuilt_on_dictionary_change(self):
+        """prompt 於建立時組好，只有詞彙清單變更才重新組合"""
+        from core.stt import SpeechToText
+        from config.settings import Settings
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            settings.update("dictionary", ["GitHub", "Python"])
+            with patch("core.stt.build_whisper_prompt", wraps=self._build_prompt) as mock_build:
+                stt = SpeechToText(settings)
+                self.assertEqual(stt._whisper_prompt, "GitHub,Python")
+                settings.update("llmModel", "gpt-4.1-mini")
+                self.assertEqual(stt._refresh_prompt(), "GitHub,Python")
+                self.assertEqual(mock_build.call_count, 1)
+                settings.update("dictionary", ["API"])
+                self.assertEqual(stt._refresh_prompt(), "API")
+                self.assertEqual(mock_build.call_count, 2)
+        finally:
+            settings.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestAudioFormat(unittest.TestCase):
+    """測試上傳前的音訊格式正規化"""
+
+    def test_int16_mono_passthrough(self):
+        """錄音器原生格式不應複製或轉換"""
+        import numpy as np
+        from core.recorder import to_whisper_pcm
+        audio = np.arange(100, dtype=np.int16)
+        self.assertIs(to_whisper_pcm(audio), audio)
+
+    def test_float_stereo_resampled(self):
+        """float 立體聲 44.1kHz 應轉為 int16 mono 16kHz"""
+        import numpy as np
+        from core.recorder import to_whisper_pcm
+        audio = np.full((44100, 2), 0.5, dtype=np.float32)
+        out = to_whisper_pcm(audio, sample_rate=44100)
+        self.assertEqual(out.dtype, np.int16)
+        self.assertEqual(out.shape, (16000,))
+        self.assertEqual(int(out[0]), 16383)
+
+    def test_integer_formats_scaled(self):
+        """int32 / uint8 等整數格式應依位元數縮放到 int16，而非直接截斷"""
+        import numpy as np
+        from core.recorder import to_whisper_pcm
+        audio = np.array([-2**31, -2**30, 0, 2**30, 2**31 - 1], dtype=np.int32)
+        np.testing.assert_array_equal(
+            to_whisper_pcm(audio), np.array([-32768, -16384, 0, 16384, 32767], dtype=np.int16))
+        audio = np.array([0, 64, 128, 255], dtype=np.uint8)
+        np.testing.assert_array_equal(
+            to_whisper_pcm(audio), np.array([-32768, -16384, 0, 32512], dtype=np.int16))
+        stereo = np.array([[1000, 3000], [-1000, -3000]], dtype=np.int16)
+        np.testing.assert_array_equal(to_whisper_pcm(stereo), np.array([2000, -2000], dtype=np.int16))
+
+    def test_upload_falls_back_to_wav(self):
+        """Opus 編碼失敗時改用 WAV，且之後不再嘗試 Opus"""
+        import numpy as np
+        import core.recorder
+        audio = np.zeros(1600, dtype=np.int16)
+
+        with patch("core.recorder._opus_available", True), \
+             patch("core.recorder.audio_to_opus_bytes", side_effect=RuntimeError("no libopus")) as mock_opus:
+            name, data, mime = core.recorder.audio_to_upload(audio)
+            self.assertEqual((name, mime), ("recording.wav", "audio/wav"))
+            self.assertEqual(data[:4], b"RIFF")
+            self.assertFalse(core.recorder._opus_available)
+            core.recorder.audio_to_upload(audio)
+            mock_opus.assert_called_once()
+
+    @patch("core.recorder.audio_to_opus_bytes", return_value=b"OggS")
+    def test_upload_prefers_opus(self, _mock_opus):
+        """可用時上傳 Ogg/Opus"""
+        import numpy as np
+        import core.recorder
+        with patch("core.recorder._opus_available", True):
+            upload = core.recorder.audio_to_upload(np.zeros(1600, dtype=np.int16))
+        self.assertEqual(upload, ("recording.ogg", b"OggS", "audio/ogg"))
+
+
+class TestRecorderDevice(unittest.TestCase):
+    """測試錄音裝置選擇"""
+
+    def setUp(self):
+        import core.recorder
+        core.recorder._wasapi_kwargs = None
+
+    def tearDown(self):
+        import core.recorder
+        core.recorder._wasapi_kwargs = None
+
+    def test_wasapi_device_with_fallback(self):
+        """Windows 上使用 WASAPI 預設輸入裝置，開啟失敗時退回預設裝置"""
+        from core.recorder import AudioRecorder
+
+        with patch("core.recorder.sys.platform", "win32"), \
+             patch("core.recorder.sd") as mock_sd:
+            mock_sd.query_hostapis.return_value = [
+                {"name": "MME", "default_input_device": 1},
+                {"name": "Windows WASAPI", "default_input_device": 7},
+            ]
+            mock_sd.InputStream.side_effect = [RuntimeError("busy"), MagicMock()]
+
+            recorder = AudioRecorder()
+            recorder.start()
+
+            first, second = mock_sd.InputStream.call_args_list
+            self.assertEqual(first.kwargs["device"], 7)
+            self.assertEqual(first.kwargs["latency"], "low")
+            self.assertNotIn("device", second.kwargs)
+            recorder._stream.start.assert_called_once()
+
+    def test_buffer_grows_and_returns_recorded_samples(self):
+        """錄音超過預配置長度時擴充緩衝，停止後回傳完整且連續的樣本"""
+        import numpy as np
+        from core.recorder import AudioRecorder
+
+        with patch("core.recorder.sd"), \
+             patch("core.recorder.INITIAL_BUFFER_SECONDS", 1):
+            recorder = AudioRecorder()
+            recorder.start()
+            blocks = [np.full((1024, 1), i, dtype=np.int16) for i in range(20)]
+            for block in blocks:
+                recorder._callback(block, len(block), None, None)
+            audio = recorder.stop()
+
+        self.assertEqual(audio.shape, (20 * 1024,))
+        np.testing.assert_array_equal(audio, np.concatenate(blocks).flatten())
+        self.assertEqual(len(recorder.stop()), 0)
+
+
+class TestLocalSTT(unittest.TestCase):
+    """測試本地 faster-whisper 載入參數"""
+
+    def test_local_model_int8_and_vad(self):
+        """本地模型以 int8 載入、存放在設定目錄，辨識時啟用 VAD"""
+        import numpy as np
+        from config.settings import Settings
+        from core.stt import SpeechToText
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            stt = SpeechToText(settings)
+
+            mock_cls = MagicMock()
+            mock_cls.return_value.transcribe.return_value = (
+                [MagicMock(text=" 你好 ")], MagicMock())
+            with patch.object(SpeechToText, "_WhisperModel", mock_cls):
+                text = stt._transcribe_local(np.zeros(1600, dtype=np.int16), "small", "zh-TW")
+                stt._transcribe_local(np.zeros(1600, dtype=np.int16), "small", "auto")
+
+            self.assertEqual(text, "你好")
+            mock_cls.assert_called_once()
+            load_kwargs = mock_cls.call_args.kwargs
+            self.assertEqual(load_kwargs["compute_type"], "int8")
+            self.assertEqual(load_kwargs["download_root"], str(settings.config_dir / "models"))
+            run_kwargs = mock_cls.return_value.transcribe.call_args_list[0].kwargs
+            self.assertTrue(run_kwargs["vad_filter"])
+            self.assertEqual(run_kwargs["language"], "zh")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_local_model_loaded_once_concurrently(self):
+        """預熱與辨識同時載入本地模型時只建立一次"""
+        import threading
+        from config.settings import Settings
+        from core.stt import SpeechToText
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            stt = SpeechToText(settings)
+
+            started = threading.Event()
+            release = threading.Event()
+
+            def slow_model(*args, **kwargs):
+                started.set()
+                release.wait(1.0)
+                return MagicMock()
+
+            mock_cls = MagicMock(side_effect=slow_model)
+            with patch.object(SpeechToText, "_WhisperModel", mock_cls):
+                threads = [threading.Thread(target=stt._load_local_model, args=("small",))
+                           for _ in range(3)]
+                for t in threads:
+                    t.start()
+                started.wait(1.0)
+                release.set()
+                for t in threads:
+                    t.join(1.0)
+                self.assertIs(stt._load_local_model("small"), stt._local_model[1])
+
+            mock_cls.assert_called_once()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_frozen_build_without_local_stt(self):
+        """預設打包的 exe 沒有 faster-whisper 時，應提示改用 --with-local-stt 打包"""
+        from config.settings import Settings
+        from core.stt import SpeechToText
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            stt = SpeechToText(settings)
+            with patch.object(SpeechToText, "_WhisperModel", None), \
+                 patch.dict(sys.modules, {"faster_whisper": None}), \
+                 patch.object(sys, "frozen", True, create=True):
+                with self.assertRaises(ImportError) as ctx:
+                    stt._load_local_model("small")
+            self.assertIn("--with-local-stt", str(ctx.exception))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 class TestLLMPromptBuilder(unittest.TestCase):
     """測試 LLM 系統提示詞構建"""
 
@@ -239,6 +505,305 @@ class TestLLMPromptBuilder(unittest.TestCase):
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
+    def test_prompt_cache_invalidated_on_save(self):
+        """設定儲存後應重新組合系統提示詞"""
+        from config.settings import Settings
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            cfg = settings.load()
+            cfg["dictionary"] = ["GitHub"]
+
+            from core.llm import LLMProcessor
+            llm = LLMProcessor(settings)
+
+            prompt1 = llm._get_system_prompt(cfg)
+            self.assertIs(prompt1, llm._get_system_prompt(cfg))
+
+            settings.update("dictionary", ["Python"])
+            prompt2 = llm._get_system_prompt(cfg)
+            self.assertTrue(prompt2.endswith("Python"))
+            self.assertNotIn("GitHub", prompt2.split("自訂字典")[1])
+        finally:
+            settings.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestLLMClientCache(unittest.TestCase):
+    """測試 LLM 客戶端快取"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_openai_client_reused(self):
+        """相同 provider / key 應重複使用同一個客戶端"""
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+
+        settings = Settings(config_dir=self.temp_dir)
+        settings.load()
+        llm = LLMProcessor(settings)
+
+        mock_openai = MagicMock(side_effect=lambda **kw: MagicMock())
+        with patch.object(LLMProcessor, "_OpenAI", mock_openai):
+            c1 = llm._get_openai_client("openai", "key-1")
+            c2 = llm._get_openai_client("openai", "key-1")
+            c3 = llm._get_openai_client("openai", "key-2")
+
+        self.assertIs(c1, c2)
+        self.assertIsNot(c1, c3)
+        self.assertEqual(mock_openai.call_count, 2)
+
+    def test_stt_and_llm_share_http_pool(self):
+        """STT 與 LLM 的 SDK 客戶端共用同一個 httpx 連線池"""
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+        from core.net import get_http_client
+        from core.stt import SpeechToText
+
+        settings = Settings(config_dir=self.temp_dir)
+        settings.load()
+        mock_openai = MagicMock(side_effect=lambda **kw: MagicMock())
+        with patch.object(LLMProcessor, "_OpenAI", mock_openai), \
+             patch.object(SpeechToText, "_OpenAI", mock_openai):
+            LLMProcessor(settings)._get_openai_client("openai", "key-1")
+            SpeechToText(settings)._get_openai_client("groq", "key-2")
+
+        pools = [c.kwargs["http_client"] for c in mock_openai.call_args_list]
+        self.assertIs(pools[0], get_http_client())
+        self.assertIs(pools[1], get_http_client())
+
+    def test_prewarm_opens_connection(self):
+        """預熱應建立客戶端並發出輕量請求；沒有 API Key 時略過"""
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+
+        settings = Settings(config_dir=self.temp_dir)
+        self.addCleanup(settings.close)
+        settings.load()
+        llm = LLMProcessor(settings)
+
+        mock_openai = MagicMock()
+        with patch.object(LLMProcessor, "_OpenAI", mock_openai):
+            llm.prewarm()
+            mock_openai.assert_not_called()
+
+            settings.update("apiKeys", {"openai": "sk-test"})
+            llm.prewarm()
+            client = mock_openai.return_value
+            client.with_options.return_value.models.list.assert_called_once()
+
+    def test_ollama_stream_joined(self):
+        """Ollama 串流回應應逐行解析並合併"""
+        import httpx
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+
+        settings = Settings(config_dir=self.temp_dir)
+        cfg = settings.load()
+        llm = LLMProcessor(settings)
+
+        lines = [
+            {"message": {"content": "你好"}, "done": False},
+            {"message": {"content": "，世界。"}, "done": False},
+            {"message": {"content": ""}, "done": True},
+        ]
+        body = "\n".join(json.dumps(x, ensure_ascii=False) for x in lines)
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+        llm._ollama_client = httpx.Client(transport=transport)
+
+        tokens = []
+        self.assertEqual(llm._polish_ollama("你好世界", cfg, tokens.append), "你好，世界。")
+        self.assertEqual(tokens, ["你好", "，世界。"])
+
+    def test_openai_stream_tokens(self):
+        """OpenAI 相容引擎以串流呼叫，逐段回呼並合併結果"""
+        from types import SimpleNamespace
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+
+        settings = Settings(config_dir=self.temp_dir)
+        cfg = settings.load()
+        llm = LLMProcessor(settings)
+
+        def chunk(text):
+            delta = SimpleNamespace(content=text)
+            return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        client = MagicMock()
+        client.chat.completions.create.return_value = iter([
+            chunk("我覺得"), chunk(None), SimpleNamespace(choices=[]), chunk("不錯。"),
+        ])
+
+        tokens = []
+        result = llm._stream_chat(client, "gpt-4o-mini", "嗯我覺得不錯", cfg, tokens.append)
+
+        self.assertEqual(result, "我覺得不錯。")
+        self.assertEqual(tokens, ["我覺得", "不錯。"])
+        self.assertTrue(client.chat.completions.create.call_args.kwargs["stream"])
+
+    def test_detect_context_patterns(self):
+        """視窗標題應對應到正確語境，同一標題不重複比對"""
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+
+        settings = Settings(config_dir=self.temp_dir)
+        settings.load()
+        llm = LLMProcessor(settings)
+        llm._target_hwnd = 0x1234
+
+        with patch("core.llm._load_win32gui", return_value=True), \
+             patch("core.llm._GetWindowText", return_value="Inbox - Gmail"):
+            self.assertIn("郵件", llm._detect_context())
+            with patch("core.llm._CONTEXT_PATTERNS", []):
+                # 標題未變，直接使用快取結果
+                self.assertIn("郵件", llm._detect_context())
+
+        with patch("core.llm._load_win32gui", return_value=True), \
+             patch("core.llm._GetWindowText", return_value="main.py - PyCharm"):
+            self.assertIn("寫程式", llm._detect_context())
+
+
+class TestLLMSkip(unittest.TestCase):
+    """測試不需要 LLM 時直接輸出原文"""
+
+    def setUp(self):
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings = Settings(config_dir=self.temp_dir)
+        self.settings.load()
+        self.llm = LLMProcessor(self.settings)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_clean_text_skips_llm(self):
+        """沒有口頭禪且句尾有標點時不呼叫 LLM"""
+        with patch.object(self.llm, "_polish_openai") as mock_polish:
+            self.assertEqual(self.llm.polish(" 我覺得這個設計不太好。 "), "我覺得這個設計不太好。")
+            self.assertEqual(self.llm.polish("Let's ship it today."), "Let's ship it today.")
+        mock_polish.assert_not_called()
+
+    def test_filler_or_missing_punct_uses_llm(self):
+        """有口頭禪，或長句缺少句尾標點時仍送 LLM"""
+        with patch.object(self.llm, "_polish_openai", return_value="ok") as mock_polish:
+            self.llm.polish("嗯我覺得這個設計不太好。")
+            self.llm.polish("I um think so.")
+            self.llm.polish("我覺得這個設計不太好我們下週開會時再一起討論要怎麼調整會比較合適")
+        self.assertEqual(mock_polish.call_count, 3)
+
+    def test_should_polish_short_and_custom_fillers(self):
+        """短句直接輸出；口頭禪清單與長度上限可由設定調整"""
+        from core.llm import should_polish
+        cfg = self.settings.config
+        self.assertFalse(should_polish("打開設定頁面", cfg))
+        self.assertFalse(should_polish("This is likely fine", cfg))
+
+        cfg["fillers"] = ["設定"]
+        self.assertTrue(should_polish("打開設定頁面", cfg))
+
+        cfg["fillers"] = []
+        cfg["polishSkipMaxLen"] = 0
+        self.assertTrue(should_polish("打開設定頁面", cfg))
+
+    def test_features_disabled_skips_llm(self):
+        """去贅字與格式化都關閉時直接回傳原文"""
+        self.settings.get_config().update(removeFiller=False, autoFormat=False)
+        with patch.object(self.llm, "_polish_openai") as mock_polish:
+            self.assertEqual(self.llm.polish("嗯那個我想問一下"), "嗯那個我想問一下")
+        mock_polish.assert_not_called()
+
+
+class TestPolishCache(unittest.TestCase):
+    """測試 LLM 修飾結果快取"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_lru_eviction_and_persistence(self):
+        """超過容量時淘汰最久未用的項目，存檔後可重新載入"""
+        from core.polish_cache import PolishCache
+        path = os.path.join(self.temp_dir, "polish_cache.json")
+        cache = PolishCache(path, max_size=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+        self.assertIsNone(cache.get("b"))
+        cache.save()
+
+        reloaded = PolishCache(path, max_size=2)
+        reloaded.load()
+        self.assertEqual(reloaded.get("a"), "A")
+        self.assertEqual(reloaded.get("c"), "C")
+
+    def test_non_object_file_ignored(self):
+        """快取檔是合法 JSON 但不是物件時，從空快取開始而不是啟動失敗"""
+        from core.polish_cache import PolishCache
+        path = os.path.join(self.temp_dir, "polish_cache.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[]")
+
+        cache = PolishCache(path)
+        cache.load()
+        self.assertEqual(len(cache), 0)
+        cache.put("a", "A")
+        cache.save()
+        reloaded = PolishCache(path)
+        reloaded.load()
+        self.assertEqual(reloaded.get("a"), "A")
+
+    def test_repeated_text_skips_llm(self):
+        """相同口述內容第二次直接使用快取；換模型則重新呼叫 LLM"""
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+        from core.polish_cache import PolishCache
+
+        settings = Settings(config_dir=self.temp_dir)
+        settings.load()
+        llm = LLMProcessor(settings, cache=PolishCache())
+
+        with patch.object(llm, "_polish_openai", return_value="我想問一下。") as mock_polish:
+            self.assertEqual(llm.polish("嗯 我想問一下"), "我想問一下。")
+            self.assertEqual(llm.polish("嗯  我想問一下 "), "我想問一下。")
+            self.assertEqual(mock_polish.call_count, 1)
+
+            settings.config["llmModel"] = "gpt-4.1-mini"
+            llm.polish("嗯 我想問一下")
+            self.assertEqual(mock_polish.call_count, 2)
+
+    def test_cache_disabled(self):
+        """關閉 polishCache 時不讀寫快取，clear 會刪除快取檔"""
+        from config.settings import Settings
+        from core.llm import LLMProcessor
+        from core.polish_cache import PolishCache
+
+        settings = Settings(config_dir=self.temp_dir)
+        settings.load()
+        settings.config["polishCache"] = False
+        path = os.path.join(self.temp_dir, "polish_cache.json")
+        cache = PolishCache(path)
+        cache.put("a", "A")
+        cache.save()
+        llm = LLMProcessor(settings, cache=cache)
+
+        with patch.object(llm, "_polish_openai", return_value="我想問一下。") as mock_polish:
+            llm.polish("嗯 我想問一下")
+            llm.polish("嗯 我想問一下")
+            self.assertEqual(mock_polish.call_count, 2)
+        self.assertEqual(len(cache), 1)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(os.path.exists(path))
+
 
 class TestHotkeyManager(unittest.TestCase):
     """測試快捷鍵管理"""
@@ -250,8 +815,8 @@ class TestHotkeyManager(unittest.TestCase):
         for key in expected_keys:
             self.assertIn(key, HOTKEY_MAP, f"HOTKEY_MAP missing: {key}")
 
-    @patch("core.hotkey.keyboard")
-    def test_register_and_unhook(self, mock_kb):
+    @patch("core.hotkey._KeyboardHook")
+    def test_register_and_unhook(self, mock_hook_cls):
         """註冊後 unhook 應正確清理"""
         from core.hotkey import HotkeyManager
         from config.settings import Settings
@@ -266,20 +831,21 @@ class TestHotkeyManager(unittest.TestCase):
             mock_release = MagicMock()
             mgr.register(mock_press, mock_release)
 
-            # 確認有註冊
-            self.assertIsNotNone(mgr._press_hook)
-            self.assertIsNotNone(mgr._release_hook)
+            # 確認有註冊（單一 hook 處理按下與釋放，只監聽設定的按鍵）
+            self.assertIsNotNone(mgr._hook)
+            mock_hook_cls.assert_called_once_with(0xA5, mgr._handle_event)
             self.assertTrue(mgr._running)
 
             # unhook
+            hook = mgr._hook
             mgr.unhook()
-            self.assertIsNone(mgr._press_hook)
-            self.assertIsNone(mgr._release_hook)
+            hook.stop.assert_called_once()
+            self.assertIsNone(mgr._hook)
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
-    @patch("core.hotkey.keyboard")
-    def test_stop_cleans_everything(self, mock_kb):
+    @patch("core.hotkey._KeyboardHook")
+    def test_stop_cleans_everything(self, mock_hook_cls):
         """stop() 應停止監聽並清理 hook"""
         from core.hotkey import HotkeyManager
         from config.settings import Settings
@@ -293,14 +859,13 @@ class TestHotkeyManager(unittest.TestCase):
             mgr.stop()
 
             self.assertFalse(mgr._running)
-            self.assertIsNone(mgr._press_hook)
-            self.assertIsNone(mgr._release_hook)
+            self.assertIsNone(mgr._hook)
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
-    @patch("core.hotkey.keyboard")
-    def test_suppress_is_false(self, mock_kb):
-        """確認 suppress=False 避免鍵盤鎖死"""
+    @patch("core.hotkey._KeyboardHook")
+    def test_reregister_replaces_hook(self, mock_hook_cls):
+        """重複註冊時先移除舊 hook，不會留下多個 hook"""
         from core.hotkey import HotkeyManager
         from config.settings import Settings
 
@@ -310,23 +875,99 @@ class TestHotkeyManager(unittest.TestCase):
             settings.load()
             mgr = HotkeyManager(settings)
             mgr.register(lambda: None, lambda: None)
+            first = mgr._hook
+            mgr.register(lambda: None, lambda: None)
 
-            # 檢查 on_press_key 和 on_release_key 被呼叫時 suppress=False
-            for call in mock_kb.on_press_key.call_args_list:
-                kwargs = call.kwargs if call.kwargs else {}
-                args = call.args if call.args else ()
-                # suppress 可能是 positional 或 keyword
-                if "suppress" in kwargs:
-                    self.assertFalse(kwargs["suppress"],
-                                    "suppress must be False to prevent keyboard lockup")
-            for call in mock_kb.on_release_key.call_args_list:
-                kwargs = call.kwargs if call.kwargs else {}
-                if "suppress" in kwargs:
-                    self.assertFalse(kwargs["suppress"],
-                                    "suppress must be False to prevent keyboard lockup")
+            first.stop.assert_called_once()
+            self.assertEqual(mock_hook_cls.call_count, 2)
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
+    @patch("core.hotkey._KeyboardHook")
+    def test_auto_repeat_fires_press_once(self, mock_hook_cls):
+        """按住時的自動重複按下只觸發一次 on_press"""
+        from core.hotkey import HotkeyManager
+        from config.settings import Settings
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            mgr = HotkeyManager(settings)
+            on_press, on_release = MagicMock(), MagicMock()
+            mgr.register(on_press, on_release)
+
+            with patch.object(mgr, "_dispatch", side_effect=lambda handler: handler()):
+                for is_down in (True, True, True, False, True, False):
+                    mgr._handle_event(is_down)
+
+            self.assertEqual(on_press.call_count, 2)
+            self.assertEqual(on_release.call_count, 2)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @patch("core.hotkey._KeyboardHook")
+    def test_stop_ends_dispatch_thread(self, mock_hook_cls):
+        """stop() 結束回呼執行緒；再次註冊時啟動新的執行緒，不會累積"""
+        import threading
+        from core.hotkey import HotkeyManager
+        from config.settings import Settings
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            mgr = HotkeyManager(settings)
+            mgr.register(lambda: None, lambda: None)
+            first = mgr._dispatcher
+            mgr.stop()
+            first.join(1.0)
+            self.assertFalse(first.is_alive())
+
+            pressed = threading.Event()
+            mgr.register(pressed.set, lambda: None)
+            self.assertIsNot(mgr._dispatcher, first)
+            mgr._handle_event(True)
+            self.assertTrue(pressed.wait(1.0))
+            second = mgr._dispatcher
+            mgr.stop()
+            second.join(1.0)
+            self.assertFalse(second.is_alive())
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_keyboard_proc_always_calls_next_hook(self):
+        """hook 程序不論按鍵、事件類型或 callback 是否出錯，都交給 CallNextHookEx"""
+        import ctypes
+        import core.hotkey as hotkey
+
+        class KbdStruct(ctypes.Structure):
+            _fields_ = [("vkCode", ctypes.c_uint32), ("scanCode", ctypes.c_uint32),
+                        ("flags", ctypes.c_uint32), ("time", ctypes.c_uint32),
+                        ("dwExtraInfo", ctypes.c_size_t)]
+
+        mock_user32 = MagicMock()
+        mock_user32.CallNextHookEx.return_value = 0
+        callback = MagicMock()
+        hook = hotkey._KeyboardHook(0xA5, callback)
+        target, other = KbdStruct(vkCode=0xA5), KbdStruct(vkCode=0x41)
+        cases = [
+            (hotkey.HC_ACTION, hotkey.WM_SYSKEYDOWN, target),
+            (hotkey.HC_ACTION, hotkey.WM_KEYUP, target),
+            (hotkey.HC_ACTION, hotkey.WM_KEYDOWN, other),
+            (-1, hotkey.WM_KEYDOWN, target),
+        ]
+        with patch.object(hotkey, "_user32", mock_user32, create=True), \
+             patch.object(hotkey, "_KBDLLHOOKSTRUCT", KbdStruct, create=True):
+            for n_code, w_param, kb in cases:
+                self.assertEqual(hook._proc(n_code, w_param, ctypes.addressof(kb)), 0)
+            callback.side_effect = RuntimeError("boom")
+            self.assertEqual(hook._proc(hotkey.HC_ACTION, hotkey.WM_KEYDOWN,
+                                        ctypes.addressof(target)), 0)
+
+        self.assertEqual(mock_user32.CallNextHookEx.call_count, len(cases) + 1)
+        self.assertEqual([c.args for c in callback.call_args_list], [(True,), (False,), (True,)])
+
 
 class TestSounds(unittest.TestCase):
     """測試音效模組"""
@@ -363,11 +1004,11 @@ class TestSounds(unittest.TestCase):
 class TestInjector(unittest.TestCase):
     """測試文字注入模組"""
 
-    @patch("core.injector.pyautogui")
+    @patch("core.injector._send_inputs")
     @patch("core.injector.pyperclip")
-    def test_inject_copies_and_pastes(self, mock_clip, mock_gui):
-        """注入應複製到剪貼簿再貼上"""
-        from core.injector import TextInjector
+    def test_inject_copies_and_pastes(self, mock_clip, mock_send):
+        """注入應複製到剪貼簿再以 SendInput 送出 Ctrl+V"""
+        from core.injector import TextInjector, _CTRL_V
         from config.settings import Settings
 
         temp_dir = tempfile.mkdtemp()
@@ -378,13 +1019,13 @@ class TestInjector(unittest.TestCase):
             injector.inject("Hello World")
 
             mock_clip.copy.assert_called_once_with("Hello World")
-            mock_gui.hotkey.assert_called_once_with("ctrl", "v")
+            mock_send.assert_called_once_with(_CTRL_V)
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
-    @patch("core.injector.pyautogui")
+    @patch("core.injector._send_inputs")
     @patch("core.injector.pyperclip")
-    def test_inject_empty_skips(self, mock_clip, mock_gui):
+    def test_inject_empty_skips(self, mock_clip, mock_send):
         """空文字不注入"""
         from core.injector import TextInjector
         from config.settings import Settings
@@ -397,13 +1038,13 @@ class TestInjector(unittest.TestCase):
             injector.inject("")
 
             mock_clip.copy.assert_not_called()
-            mock_gui.hotkey.assert_not_called()
+            mock_send.assert_not_called()
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
-    @patch("core.injector.pyautogui")
+    @patch("core.injector._send_inputs")
     @patch("core.injector.pyperclip")
-    def test_inject_chinese_text(self, mock_clip, mock_gui):
+    def test_inject_chinese_text(self, mock_clip, mock_send):
         """中文文字注入"""
         from core.injector import TextInjector
         from config.settings import Settings
@@ -418,6 +1059,50 @@ class TestInjector(unittest.TestCase):
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
+    @patch("core.injector._send_inputs")
+    @patch("core.injector.pyperclip")
+    def test_inject_keyboard_mode(self, mock_clip, mock_send):
+        """keyboard 模式以 Unicode 按鍵輸入，不動剪貼簿"""
+        from core.injector import TextInjector, KEYEVENTF_UNICODE, KEYEVENTF_KEYUP
+        from config.settings import Settings
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            settings.config["outputMode"] = "keyboard"
+            TextInjector(settings).inject("你好😀")
+
+            mock_clip.copy.assert_not_called()
+            inputs = mock_send.call_args[0][0]
+            downs = [i.u.ki.wScan for i in inputs if not i.u.ki.dwFlags & KEYEVENTF_KEYUP]
+            # emoji 拆成 UTF-16 代理對
+            self.assertEqual(downs, [ord("你"), ord("好"), 0xD83D, 0xDE00])
+            self.assertTrue(all(i.u.ki.dwFlags & KEYEVENTF_UNICODE for i in inputs))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_unicode_inputs_newline_uses_enter(self):
+        """換行轉成 Enter 鍵"""
+        from core.injector import _unicode_inputs, VK_RETURN
+
+        inputs = _unicode_inputs("a\r\nb")
+        self.assertEqual([i.u.ki.wVk for i in inputs], [0, 0, VK_RETURN, VK_RETURN, 0, 0])
+
+    def test_key_sequences(self):
+        """預建的按鍵序列：先按下再反序放開"""
+        from core.injector import (
+            _CTRL_V, _ESCAPE, KEYEVENTF_KEYUP, VK_CONTROL, VK_ESCAPE, VK_V,
+        )
+
+        keys = [(i.u.ki.wVk, i.u.ki.dwFlags) for i in _CTRL_V]
+        self.assertEqual(keys, [
+            (VK_CONTROL, 0), (VK_V, 0),
+            (VK_V, KEYEVENTF_KEYUP), (VK_CONTROL, KEYEVENTF_KEYUP),
+        ])
+        keys = [(i.u.ki.wVk, i.u.ki.dwFlags) for i in _ESCAPE]
+        self.assertEqual(keys, [(VK_ESCAPE, 0), (VK_ESCAPE, KEYEVENTF_KEYUP)])
+
 
 class TestSingleInstance(unittest.TestCase):
     """測試單實例鎖"""
@@ -442,20 +1127,297 @@ class TestSingleInstance(unittest.TestCase):
         with open(main_path, "r", encoding="utf-8") as f:
             content = f.read()
         self.assertIn("atexit.register(self._cleanup)", content)
-        self.assertIn("keyboard.unhook_all()", content)
+        self.assertIn("self.hotkey.stop()", content)
+
+    def test_heavy_modules_loaded_lazily(self):
+        """錄音、STT、LLM、注入模組不在 main.py 頂層載入"""
+        main_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        with open(main_path, "r", encoding="utf-8") as f:
+            top_level = [line for line in f if line.startswith(("import ", "from "))]
+        for module in ("core.recorder", "core.stt", "core.llm", "core.injector", "core.tray_icons"):
+            self.assertFalse(any(module in line for line in top_level), module)
+
+    def test_stt_does_not_import_recorder(self):
+        """匯入 core.stt 不應連帶載入錄音模組（sounddevice / PortAudio）"""
+        import subprocess
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, core.stt; sys.exit('core.recorder' in sys.modules)"],
+            cwd=root)
+        self.assertEqual(result.returncode, 0)
+
+
+class VoiceTypeAppTestCase(unittest.TestCase):
+    """建立 VoiceType 主程式，STT / LLM / 注入 / 快捷鍵元件皆為 mock"""
+
+    def setUp(self):
+        from config.settings import Settings
+        import numpy as np
 
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.settings = Settings(config_dir=self.temp_dir)
+        self.settings.load()
 
-class TestErrorRecovery(unittest.TestCase):
+        # winsound 只存在於 Windows，其他平台匯入 main 時以 mock 代替（測試結束後還原）
+        modules = {}
+        try:
+            import winsound  # noqa: F401
+        except ImportError:
+            modules["winsound"] = MagicMock()
+        module_patch = patch.dict(sys.modules, modules)
+        module_patch.start()
+        self.addCleanup(module_patch.stop)
+        import main
+        self.main = main
+
+        with patch("main.Settings", return_value=self.settings), patch("main.HotkeyManager"):
+            self.app = main.VoiceType()
+        self.addCleanup(self._shutdown_executors)
+        self.app.stt = MagicMock()
+        self.app.stt.transcribe.return_value = "打開設定頁面"
+        self.app.llm = MagicMock()
+        self.app.llm.polish.side_effect = lambda text, **kwargs: text.strip()
+        self.app.injector = MagicMock()
+        self.app._alt_released = lambda: True
+        self.audio = np.zeros(16000, dtype=np.int16)  # 1 秒
+
+    def _shutdown_executors(self):
+        for executor in (self.app._upload_encoder, self.app._processor, self.app._watchdog):
+            executor.shutdown(wait=True)
+
+
+class TestErrorRecovery(VoiceTypeAppTestCase):
     """測試錯誤恢復機制"""
 
-    def test_hotkey_reregister_in_finally(self):
-        """_process_audio 的 finally 應重新註冊快捷鍵"""
-        main_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
-        with open(main_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        # 確認 finally 區塊有重新註冊邏輯
-        self.assertIn("if not self.hotkey._press_hook:", content)
-        self.assertIn("Hotkey re-registered after error recovery", content)
+    def test_hotkey_reregistered_when_injection_fails(self):
+        """注入期間出錯（hook 已移除）時，finally 應重新註冊快捷鍵"""
+        app = self.app
+        app.injector.inject.side_effect = RuntimeError("paste failed")
+        with patch("main.threading.Timer"):
+            app._process_audio(self.audio)
+
+        app.hotkey.unhook.assert_called_once()
+        app.hotkey.register.assert_called_once_with(
+            on_press=app.on_hotkey_press, on_release=app.on_hotkey_release)
+
+    def test_hotkey_not_reregistered_twice_on_success(self):
+        """正常完成時只在注入後註冊一次"""
+        self.app._process_audio(self.audio)
+        self.app.hotkey.register.assert_called_once()
+
+    def test_reload_settings_reuses_hotkey_manager(self):
+        """重新載入設定沿用同一個快捷鍵管理器，不會每次多建一個回呼執行緒"""
+        app = self.app
+        hotkey = app.hotkey
+        app._reload_settings()
+
+        self.assertIs(app.hotkey, hotkey)
+        hotkey.stop.assert_not_called()
+        hotkey.register.assert_called_once_with(
+            on_press=app.on_hotkey_press, on_release=app.on_hotkey_release)
+
+
+class TestVoiceTypePipeline(VoiceTypeAppTestCase):
+    """以 mock 元件測試主程式的語音處理管線"""
+
+    def test_wait_until_polls_until_condition(self):
+        """條件成立即返回；逾時回傳 False"""
+        results = iter([False, False, True])
+        with patch("main.time.sleep") as mock_sleep:
+            self.assertTrue(self.app._wait_until(lambda: next(results), timeout=1.0))
+        self.assertEqual(mock_sleep.call_count, 2)
+        mock_sleep.assert_called_with(self.main.WAIT_POLL_SECONDS)
+        self.assertFalse(self.app._wait_until(lambda: False, timeout=0.02, poll=0.001))
+
+    def test_escape_sent_after_alt_released_without_fixed_sleep(self):
+        """Alt 實際放開後才送 Escape，注入前不做固定長度的 sleep"""
+        events = []
+        alt_states = iter([False, False, True])
+
+        def alt_released():
+            released = next(alt_states)
+            events.append(("alt", released))
+            return released
+
+        self.app._alt_released = alt_released
+        self.app.injector.send_escape.side_effect = lambda: events.append(("escape",))
+        self.app.injector.inject.side_effect = lambda text: events.append(("inject", text))
+        with patch("main.time.sleep") as mock_sleep:
+            self.app._process_audio(self.audio)
+
+        self.assertEqual(events, [
+            ("alt", False), ("alt", False), ("alt", True),
+            ("escape",), ("inject", "打開設定頁面"),
+        ])
+        for call in mock_sleep.call_args_list:
+            self.assertEqual(call.args, (self.main.WAIT_POLL_SECONDS,))
+
+
+    def test_run_blocks_until_quit_then_shuts_down(self):
+        """run() 阻塞等待結束事件（不輪詢），托盤執行緒呼叫 _quit 後才結束"""
+        import threading
+        app = self.app
+        app._processor = MagicMock()
+        for name in ("_check_api_keys", "_prewarm_network", "_preload_recorder",
+                     "_install_console_handler", "_shutdown"):
+            setattr(app, name, MagicMock())
+        app._create_tray_icon = MagicMock(return_value=None)
+
+        quitter = threading.Timer(0.05, app._quit)
+        # settings_server 依賴 winreg，這裡只需要 sync_autostart 不做事
+        with patch.dict(sys.modules, {"config.settings_server": MagicMock()}), \
+             patch("main.atexit.register"), \
+             patch("main.time.sleep") as mock_sleep:
+            quitter.start()
+            with self.assertRaises(SystemExit):
+                app.run()
+
+        self.assertTrue(app._quit_event.is_set())
+        app._install_console_handler.assert_called_once()
+        app._shutdown.assert_called_once()
+        mock_sleep.assert_not_called()
+        app.hotkey.register.assert_called_once()
+
+    def test_utterances_share_one_processing_thread(self):
+        """每次放開快捷鍵都交給同一條常駐執行緒，初始化（COM）只做一次"""
+        import threading
+        app = self.app
+        init_calls = []
+        app._init_processing_thread = lambda: init_calls.append(threading.get_ident())
+        app._processor.shutdown()
+        app._processor = app._new_processor()
+        app.settings.config["sttProvider"] = "local"  # 不經背景編碼
+        app.recorder = MagicMock()
+        app.recorder.stop.return_value = self.audio
+        done = []
+        app._process_audio = MagicMock(
+            side_effect=lambda *args: done.append(threading.get_ident()))
+
+        with patch("main.play_stop"):
+            for _ in range(2):
+                app.is_recording = True
+                app.on_hotkey_release()
+                app._processor.submit(lambda: None).result(timeout=5)
+
+        self.assertEqual(len(init_calls), 1)
+        self.assertEqual(done, init_calls * 2)
+        app._process_audio.assert_called_with(self.audio, None)
+
+    def test_processing_timeout_replaces_worker(self):
+        """處理逾時：換新的處理執行緒並強制恢復 hook"""
+        import concurrent.futures
+        app = self.app
+        stuck = app._processor = MagicMock()
+        app._emergency_hook_recovery = MagicMock()
+        future = MagicMock()
+        future.result.side_effect = concurrent.futures.TimeoutError()
+
+        app._watch_processing(future)
+
+        future.result.assert_called_once_with(timeout=self.main.PROCESSING_TIMEOUT_SECONDS)
+        stuck.shutdown.assert_called_once_with(wait=False)
+        self.assertIsNot(app._processor, stuck)
+        app._emergency_hook_recovery.assert_called_once()
+
+    def test_processing_logs_one_summary(self):
+        """每次語音只輸出一行摘要，耗時以 perf_counter_ns 計算"""
+        ticks = [0, 1_500_000_000, 2_000_000_000, 2_500_000_000]
+        self.app.stt.transcribe.return_value = "嗯我覺得這個設計不太好"  # 有口頭禪，需要 LLM
+        with patch("main.time.perf_counter_ns", side_effect=ticks), \
+             self.assertLogs("VoiceType", level="INFO") as logs:
+            self.app._process_audio(self.audio)
+
+        self.assertEqual(len(logs.records), 1)
+        message = logs.records[0].getMessage()
+        self.assertTrue(message.startswith("voicetype_utterance "))
+        stats = json.loads(message.split(" ", 1)[1])
+        self.assertEqual(stats["stt_s"], 1.5)
+        self.assertEqual(stats["llm_s"], 0.5)
+        self.assertEqual(stats["total_s"], 2.5)
+        self.assertEqual(stats["polished"], "嗯我覺得這個設計不太好")
+
+    def test_transcribe_marks_network_use(self):
+        """STT 完成後記錄連線使用時間，短時間內再次錄音不重新預熱"""
+        self.app._last_network_use = 0.0
+        self.app.stt.transcribe.return_value = "好"  # 短句，不呼叫 LLM
+        with patch("main.time.monotonic", return_value=1000.0):
+            self.app._process_audio(self.audio)
+        self.assertEqual(self.app._last_network_use, 1000.0)
+
+    def test_error_status_reverted_by_timer(self):
+        """處理失敗：立即可重新錄音，錯誤圖標由 Timer 恢復，執行緒不等待"""
+        app = self.app
+        app.processing = True
+        app.injector.inject.side_effect = RuntimeError("paste failed")
+        app._update_tray = MagicMock()
+        with patch("main.threading.Timer") as mock_timer, \
+             patch("main.time.sleep") as mock_sleep:
+            app._process_audio(self.audio)
+
+        self.assertFalse(app.processing)
+        app._update_tray.assert_called_with("錯誤", "error")
+        mock_timer.assert_called_once_with(
+            self.main.ERROR_DISPLAY_SECONDS, app._clear_error_status)
+        mock_timer.return_value.start.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_clear_error_status_keeps_newer_state(self):
+        """錯誤顯示時間到時，只有仍在錯誤狀態才恢復就緒"""
+        app = self.app
+        app._update_tray = MagicMock()
+        app._tray_state = "recording"
+        app._clear_error_status()
+        app._update_tray.assert_not_called()
+
+        app._tray_state = "error"
+        app._clear_error_status()
+        app._update_tray.assert_called_once_with("就緒", "idle")
+
+    def test_press_without_foreground_window(self):
+        """GetForegroundWindow 回傳 NULL（None）時記為 0，不影響開始錄音"""
+        app = self.app
+        app.recorder = MagicMock()
+        app._prewarm_network = MagicMock()
+        with patch("main._GetForegroundWindow", create=True, return_value=None), \
+             patch("main._GetWindowThreadProcessId", create=True, return_value=0) as mock_tid, \
+             patch("main.play_start"):
+            app.on_hotkey_press()
+
+        self.assertEqual(app._target_hwnd, 0)
+        mock_tid.assert_called_once_with(0, None)
+        app.recorder.start.assert_called_once()
+
+    def test_restore_focus_uses_bound_win32_calls(self):
+        """焦點恢復透過預先綁定的函式，前景視窗切換後立即返回"""
+        hwnd = 0x1_0000_0010  # 超過 32 位元的 handle 原樣傳遞
+        foreground = [0]
+        with patch("main._IsWindow", create=True, return_value=True), \
+             patch("main._SetForegroundWindow", create=True,
+                   side_effect=lambda h: foreground.__setitem__(0, h)) as mock_set, \
+             patch("main._GetForegroundWindow", create=True,
+                   side_effect=lambda: foreground[0]):
+            self.assertTrue(self.app._restore_focus(hwnd))
+        mock_set.assert_called_once_with(hwnd)
+
+    def test_short_utterance_skips_llm_and_succeeds(self):
+        """短句、無口頭禪：不呼叫 LLM，直接注入原文且不走錯誤路徑"""
+        from core.llm import LLMProcessor
+        app = self.app
+        app.llm = LLMProcessor(self.settings)
+        app.stt.transcribe.return_value = " 打開設定頁面 "
+        app.processing = True
+        with patch.object(app.llm, "_polish_openai") as mock_polish, \
+             patch("main.threading.Timer") as mock_timer, \
+             self.assertLogs("VoiceType", level="INFO") as logs:
+            app._process_audio(self.audio)
+
+        mock_polish.assert_not_called()
+        app.injector.inject.assert_called_once_with("打開設定頁面")
+        mock_timer.assert_not_called()
+        self.assertFalse(app.processing)
+        self.assertFalse([r for r in logs.records if r.levelname == "ERROR"])
 
 
 class TestConfigIntegration(unittest.TestCase):
@@ -485,6 +1447,94 @@ class TestConfigIntegration(unittest.TestCase):
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
+    def test_updates_coalesced_into_one_write(self):
+        """連續變更只寫檔一次，flush 後內容完整且不留暫存檔"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            from config.settings import Settings
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+
+            with patch.object(Settings, "_write", autospec=True,
+                              side_effect=Settings._write) as mock_write:
+                settings.update("language", "ja")
+                settings.update_all({"llmModel": "gpt-4.1-mini"})
+                settings.update("apiKeys", {"groq": "gsk-test"})
+                settings.flush()
+                settings.flush()
+                self.assertEqual(mock_write.call_count, 1)
+
+            cfg = Settings(config_dir=temp_dir).load()
+            self.assertEqual(cfg["language"], "ja")
+            self.assertEqual(cfg["llmModel"], "gpt-4.1-mini")
+            self.assertEqual(cfg["apiKeys"]["groq"], "gsk-test")
+            self.assertEqual(os.listdir(temp_dir), ["config.json"])
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_reload_never_empties_config(self):
+        """重新載入時就地更新、移除多餘的 key，過程中不清空設定"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            from config.settings import Settings
+
+            class NoClearDict(dict):
+                def clear(self):
+                    raise AssertionError("config emptied during reload")
+
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            settings._config = cfg = NoClearDict(settings._config, obsolete=True)
+            with open(os.path.join(temp_dir, "config.json"), "w", encoding="utf-8") as f:
+                json.dump({"language": "ja"}, f)
+
+            settings.load()
+            self.assertIs(settings.config, cfg)
+            self.assertEqual(cfg["language"], "ja")
+            self.assertNotIn("obsolete", cfg)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_load_keeps_pending_updates(self):
+        """延遲寫檔前重新載入，不應丟掉尚未寫入的變更"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            from config.settings import Settings
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            settings.update("language", "ja")
+
+            cfg = settings.load()
+            self.assertEqual(cfg["language"], "ja")
+            self.assertIsNone(settings._save_timer)
+            settings.close()
+            self.assertEqual(Settings(config_dir=temp_dir).load()["language"], "ja")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_failed_write_retried(self):
+        """寫檔失敗時保留未儲存狀態並排程重試；close 後不再排程"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            from config.settings import Settings
+            settings = Settings(config_dir=temp_dir)
+            settings.load()
+            settings.update("language", "ja")
+
+            with patch.object(Settings, "_write", side_effect=OSError("disk full")):
+                settings.flush()
+            self.assertTrue(settings._dirty)
+            self.assertIsNotNone(settings._save_timer)
+
+            settings.close()
+            self.assertFalse(settings._dirty)
+            settings.update("language", "en")
+            self.assertIsNone(settings._save_timer)
+            settings.flush()
+            self.assertEqual(Settings(config_dir=temp_dir).load()["language"], "en")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
     def test_config_handles_missing_keys(self):
         """舊版設定檔缺少新 key 時應自動補齊"""
         temp_dir = tempfile.mkdtemp()